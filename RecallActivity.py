@@ -15,10 +15,15 @@ gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 from gi.repository import Gdk
 
+import os
+
 from game import Game
+from checkpoint import Checkpoint
+from session_log import SessionLog
 from sugar3.activity.widgets import StopButton
 from sugar3.activity.widgets import ActivityToolbarButton
 from sugar3.graphics.toolbarbox import ToolbarBox
+from sugar3.graphics.alert import ConfirmationAlert
 
 from sugar3.activity import activity
 from sugar3 import profile
@@ -63,12 +68,18 @@ class RecallActivity(activity.Activity):
         canvas.show()
         self.show_all()
 
+        data_path = os.path.join(activity.get_activity_root(), 'data')
+        self._checkpoint = Checkpoint(data_path, self.get_id())
+        self._session_log = SessionLog(data_path, self.get_id())
         self._game = Game(canvas, parent=self, path=self.path,
-                          colors=self.colors)
-        if 'dotlist' in self.metadata:
+                          colors=self.colors, checkpoint=self._checkpoint,
+                          session_log=self._session_log)
+        self._game.preload_images()
+        if 'snapshot' in self.metadata or 'dotlist' in self.metadata:
             self._restore()
         else:
             self._game.new_game()
+        self._offer_recovery()
 
     def _setup_toolbars(self, have_toolbox):
         """ Setup the toolbars. """
@@ -99,13 +110,10 @@ class RecallActivity(activity.Activity):
             'game-4', self.toolbar, self._new_game_cb,
             cb_arg=2, tooltip=_('Play n-back game.'),
             group=self.radio[0]))
-        """
-        # Game mode disabled
         self.radio.append(radio_factory(
             'game-3', self.toolbar, self._new_game_cb,
             cb_arg=3, tooltip=_('Play attention game (color symbols).'),
             group=self.radio[0]))
-        """
 
         self.status = label_factory(self.toolbar, '')
 
@@ -122,19 +130,64 @@ class RecallActivity(activity.Activity):
 
     def write_file(self, file_path):
         """ Write the grid status to the Journal """
-        dot_list, correct, level, game = self._game.save_game()
-        self.metadata['dotlist'] = ''
-        for dot in dot_list:
-            self.metadata['dotlist'] += str(dot)
-            if dot_list.index(dot) < len(dot_list) - 1:
-                self.metadata['dotlist'] += ' '
-        self.metadata['correct'] = str(correct)
-        self.metadata['level'] = str(level)
-        self.metadata['game'] = str(game)
+        self.metadata['snapshot'] = json_dump(self._game.save_game())
+        self._game.save_caches()
+
+    def _offer_recovery(self):
+        """ Offer the checkpoint if it is newer than the Journal entry """
+        saved = self._checkpoint.load()
+        if saved is None:
+            return
+        saved_time, snapshot = saved
+        try:
+            journal_time = float(self.metadata.get('timestamp', 0))
+        except (TypeError, ValueError):
+            journal_time = 0
+        # The Journal timestamp is in whole seconds
+        if int(saved_time) <= journal_time:
+            return
+        alert = ConfirmationAlert()
+        alert.props.title = _('Recover game')
+        alert.props.msg = _('Recall did not close cleanly. '
+                            'Continue the game in progress?')
+        alert.connect('response', self._recovery_alert_cb, snapshot)
+        self.add_alert(alert)
+        alert.show()
+
+    def _recovery_alert_cb(self, alert, response_id, snapshot):
+        self.remove_alert(alert)
+        if response_id == Gtk.ResponseType.OK:
+            self._resume(snapshot)
+
+    def _resume(self, snapshot):
+        """ Resume a saved game (or start afresh if it is unusable) """
+        try:
+            game = int(snapshot['game'])
+            if game not in range(len(self.radio)):
+                raise ValueError('unknown game %d' % (game))
+        except (KeyError, TypeError, ValueError) as e:
+            _logger.error('could not read saved game: %s' % (e))
+            snapshot, game = None, 0
+        self._restoring = True
+        self.radio[game].set_active(True)
+        if snapshot is not None:
+            self._game.resume_game(snapshot)
+        else:
+            self._game.new_game(game=game)
+        self._restoring = False
 
     def _restore(self):
         """ Restore the game state from metadata """
         self._restoring = True
+        if 'snapshot' in self.metadata:
+            try:
+                snapshot = json_load(self.metadata['snapshot'])
+            except ValueError:
+                snapshot = None
+            self._resume(snapshot)
+            return
+
+        # Saved by an older version: the board only
         dot_list = []
         dots = self.metadata['dotlist'].split()
         for dot in dots:
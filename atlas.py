@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+Pack many small surfaces into one shared surface (a texture atlas).
+
+A sprite can be given an AtlasRegion in place of a surface; it then
+draws its sub-rectangle of the atlas through the atlas' single source
+pattern, rather than owning a private copy of the pixels.
+'''
+
+import cairo
+import math
+
+
+class AtlasRegion():
+
+    ''' A sub-rectangle of an atlas surface '''
+
+    def __init__(self, atlas, x, y, width, height):
+        self.atlas = atlas
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def get_width(self):
+        return self.width
+
+    def get_height(self):
+        return self.height
+
+    def set_source(self, cr, x, y):
+        ''' Make the region, drawn at (x, y), the source of cr '''
+        pattern = self.atlas.pattern
+        pattern.set_matrix(cairo.Matrix(x0=self.x - x, y0=self.y - y))
+        cr.set_source(pattern)
+
+
+class Atlas():
+
+    ''' Shelf-pack a dictionary of surfaces into a single surface '''
+
+    def __init__(self, surfaces, padding=1):
+        self._regions = {}
+        self.surface = None
+        self.pattern = None
+        if len(surfaces) == 0:
+            return
+
+        # Aim for a roughly square atlas
+        keys = sorted(surfaces.keys(),
+                      key=lambda k: -surfaces[k].get_height())
+        area = 0
+        for key in keys:
+            area += (surfaces[key].get_width() + padding) * \
+                (surfaces[key].get_height() + padding)
+        max_width = max(int(math.sqrt(area)),
+                        max([s.get_width() for s in surfaces.values()]))
+
+        positions = {}
+        x = y = shelf_height = width = 0
+        for key in keys:
+            w = surfaces[key].get_width()
+            h = surfaces[key].get_height()
+            if x + w > max_width:
+                x = 0
+                y += shelf_height + padding
+                shelf_height = 0
+            positions[key] = (x, y, w, h)
+            x += w + padding
+            width = max(width, x)
+            shelf_height = max(shelf_height, h)
+        height = y + shelf_height
+
+        self.surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        cr = cairo.Context(self.surface)
+        cr.set_operator(cairo.OPERATOR_SOURCE)
+        for key, (x, y, w, h) in positions.items():
+            cr.set_source_surface(surfaces[key], x, y)
+            cr.rectangle(x, y, w, h)
+            cr.fill()
+            self._regions[key] = AtlasRegion(self, x, y, w, h)
+        self.surface.flush()
+        self.pattern = cairo.SurfacePattern(self.surface)
+
+    def __contains__(self, key):
+        return key in self._regions
+
+    def __len__(self):
+        return len(self._regions)
+
+    def get_region(self, key):
+        ''' Return the AtlasRegion for key (or None) '''
+        return self._regions.get(key)
+
+    def get_size(self):
+        ''' Return the number of bytes used by the atlas '''
+        if self.surface is None:
+            return 0
+        return self.surface.get_stride() * self.surface.get_height()
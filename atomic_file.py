@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+Write a small file in the background, atomically.
+
+write() only hands the new contents to a writer thread. The thread
+writes them to a temporary file and renames it over the old one, so a
+crash or power loss never leaves a half-written file. If several writes
+arrive while one is in progress, only the newest is written.
+'''
+
+import os
+import threading
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+class AtomicWriter():
+
+    ''' Coalesced, off-thread, write-then-rename file writes '''
+
+    def __init__(self, file_path, name='recall-writer'):
+        self._file_path = file_path
+        self._name = name
+        self._lock = threading.Condition()
+        self._pending = None  # The newest unwritten contents
+        self._thread = None
+
+    def write(self, data):
+        ''' Queue data (a string) to be written; never blocks on I/O '''
+        with self._lock:
+            self._pending = data
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop,
+                                                name=self._name)
+                self._thread.daemon = True
+                self._thread.start()
+            self._lock.notify_all()
+
+    def flush(self, timeout=None):
+        ''' Wait until everything queued is on disk '''
+        with self._lock:
+            return self._lock.wait_for(lambda: self._pending is None,
+                                       timeout)
+
+    def _write_loop(self):
+        ''' Runs in the writer thread '''
+        while True:
+            with self._lock:
+                while self._pending is None:
+                    self._lock.wait()
+                data = self._pending
+            self._write(data)
+            with self._lock:
+                if self._pending is data:
+                    self._pending = None
+                self._lock.notify_all()
+
+    def _write(self, data):
+        tmp_path = self._file_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as fp:
+                fp.write(data)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.rename(tmp_path, self._file_path)
+        except (IOError, OSError) as e:
+            _logger.error('could not write %s: %s' % (self._file_path, e))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+A crash-recovery checkpoint of the game in progress.
+
+Sugar only saves to the Journal when the activity is closed. So that a
+killed activity (or a flat battery) does not lose the session, the game
+snapshot is also written to a small file after every answer. On the
+next launch, a checkpoint newer than the Journal entry can be offered
+for recovery.
+'''
+
+import os
+import time
+
+from atomic_file import AtomicWriter
+from utils import json_load, json_dump
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+CHECKPOINT = 'checkpoint.json'
+
+
+class Checkpoint():
+
+    ''' The latest game snapshot for one activity instance '''
+
+    def __init__(self, path, activity_id):
+        self._file_path = os.path.join(path, CHECKPOINT)
+        self._activity_id = activity_id
+        self._writer = AtomicWriter(self._file_path,
+                                    name='recall-checkpoint')
+
+    def save(self, snapshot):
+        ''' Queue a snapshot to be written in the background '''
+        self._writer.write(json_dump({'activity': self._activity_id,
+                                      'time': time.time(),
+                                      'snapshot': snapshot}))
+
+    def load(self):
+        ''' Return (time, snapshot) for this activity, or None '''
+        try:
+            with open(self._file_path, 'r') as fp:
+                data = json_load(fp.read())
+            if data['activity'] != self._activity_id:
+                return None
+            return float(data['time']), data['snapshot']
+        except (IOError, OSError):
+            return None
+        except (KeyError, TypeError, ValueError) as e:
+            _logger.error('could not read %s: %s' % (self._file_path, e))
+            return None
+
+    def flush(self, timeout=None):
+        ''' Wait until the latest snapshot is on disk '''
+        return self._writer.flush(timeout)
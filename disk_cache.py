@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+An on-disk cache of pre-scaled image surfaces.
+
+Each entry is the raw ARGB32 pixel data of a scaled image, stored in its
+own file. An index file records the bundle version, screen size and dot
+size the cache was built for, along with the source file mtime of every
+entry. If any of those change, the stale entries are thrown away.
+
+Entries are memory-mapped and wrapped with
+cairo.ImageSurface.create_for_data, so no image decoding is needed.
+'''
+
+import cairo
+import mmap
+import os
+import tempfile
+import threading
+
+from utils import json_load, json_dump
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+INDEX = 'index.json'
+FORMAT = cairo.FORMAT_ARGB32
+
+
+class DiskCache():
+
+    ''' Pre-scaled surfaces stored under a cache directory '''
+
+    def __init__(self, path, size, screen_size, version):
+        self._path = path
+        self._size = size
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._header = {'version': str(version),
+                        'screen': list(screen_size),
+                        'size': size}
+        self._entries = {}
+        try:
+            if not os.path.exists(self._path):
+                os.makedirs(self._path)
+        except OSError as e:
+            _logger.error('could not create %s: %s' % (self._path, e))
+            self._path = None
+            return
+        self._load_index()
+
+    def _load_index(self):
+        index = {}
+        try:
+            with open(os.path.join(self._path, INDEX), 'r') as fp:
+                index = json_load(fp.read())
+        except (IOError, OSError, ValueError):
+            pass
+        if not isinstance(index, dict) or \
+           index.get('header') != self._header:
+            self._invalidate()
+        else:
+            self._entries = index.get('entries', {})
+
+    def _invalidate(self):
+        ''' The bundle, screen or dot size changed: discard everything '''
+        for name in os.listdir(self._path):
+            if name.endswith('.argb'):
+                try:
+                    os.remove(os.path.join(self._path, name))
+                except OSError:
+                    pass
+        self._entries = {}
+        self._dirty = True
+
+    def _blob_name(self, source):
+        name = os.path.splitext(os.path.basename(source))[0]
+        return '%s-%d.argb' % (name, self._size)
+
+    def load(self, source):
+        ''' Return a surface for source (or None) without decoding it '''
+        if self._path is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(source)
+        if entry is None:
+            return None
+        try:
+            if os.path.getmtime(source) != entry['mtime']:
+                return None
+            with open(os.path.join(self._path, entry['file']), 'rb') as fp:
+                # A private mapping is writable (as cairo requires) without
+                # ever writing back to the file.
+                data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_COPY)
+            return cairo.ImageSurface.create_for_data(
+                data, FORMAT, entry['width'], entry['height'],
+                entry['stride'])
+        except (IOError, OSError, ValueError, KeyError) as e:
+            _logger.debug('disk cache miss for %s: %s' % (source, e))
+            return None
+
+    def store(self, source, surface):
+        ''' Write a surface to the cache; safe to call from any thread '''
+        if self._path is None:
+            return
+        name = self._blob_name(source)
+        path = os.path.join(self._path, name)
+        tmp_path = None
+        try:
+            mtime = os.path.getmtime(source)
+            surface.flush()
+            # Two preloaders may store the same image at once, so each
+            # write gets its own temporary file.
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self._path)
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(surface.get_data())
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            _logger.error('could not cache %s: %s' % (source, e))
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+        with self._lock:
+            self._entries[source] = {'file': name,
+                                     'mtime': mtime,
+                                     'width': surface.get_width(),
+                                     'height': surface.get_height(),
+                                     'stride': surface.get_stride()}
+            self._dirty = True
+
+    def save_index(self):
+        ''' Write the index, if anything changed '''
+        if self._path is None or not self._dirty:
+            return
+        with self._lock:
+            data = json_dump({'header': self._header,
+                              'entries': self._entries})
+            self._dirty = False
+        path = os.path.join(self._path, INDEX)
+        try:
+            with open(path + '.tmp', 'w') as fp:
+                fp.write(data)
+            os.rename(path + '.tmp', path)
+        except (IOError, OSError) as e:
+            _logger.error('could not write %s: %s' % (path, e))
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+The rules of the Recall games, free of GTK, sprites and timers.
+
+Symbols are plain integers in range(pool_size). The Engine owns the
+game state (level, score, the symbols on the board, the options and the
+answer) and reports every change the player should see as a render
+intent, by calling listener(intent, *args):
+
+  CLEAR      (level,)            a new round is starting
+  DOTS       (dots,)             show these symbols on the board
+  RECALL     (recall_list,)      n-back: show these symbols in sequence
+  QUESTION   (options,)          hide the board, ask, offer three options
+  ANSWER     (choice, correct, reveal)
+                                 the player chose an option; for n-back,
+                                 reveal is the symbol that was asked for
+  GAME_OVER  (score, high_score)
+
+A game in progress can be saved with snapshot() and picked up again
+with resume(), which goes straight back to the question.
+
+Pacing (animations, delays) is up to whoever drives the engine. Without
+a listener, the engine can be driven as fast as Python allows, e.g. to
+simulate many rounds when tuning the difficulty.
+'''
+
+import random
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+CLEAR = 'clear'
+DOTS = 'dots'
+RECALL = 'recall'
+QUESTION = 'question'
+ANSWER = 'answer'
+GAME_OVER = 'game-over'
+
+# Game modes
+REPEATED = 0  # find the repeated image
+MISSING = 1  # find the image that was not shown
+N_BACK = 2  # recall the image shown n steps ago
+COLOR_REPEATED = 3  # find the repeated image, images in several colors
+GAMES = [REPEATED, MISSING, N_BACK, COLOR_REPEATED]
+
+NUMBER_OF_DOTS = 18
+NUMBER_OF_OPTS = 3
+RECALL_LENGTH = 12
+POINTS_TO_WIN = 10
+SNAPSHOT_VERSION = 1
+
+
+class PoolTooSmall(ValueError):
+
+    ''' There are not enough different symbols to play this level '''
+
+
+class Round():
+
+    ''' Everything a round will show: the board (or n-back list), the
+    three options and which one is the answer '''
+
+    def __init__(self, dots, options, answer, repeat=None, recall_list=None):
+        self.dots = dots
+        self.options = options
+        self.answer = answer  # index into options
+        self.repeat = repeat  # index of the repeated dot
+        self.recall_list = recall_list
+
+    def get_symbols(self):
+        ''' Every symbol the round will show '''
+        symbols = set(self.dots) | set(self.options)
+        if self.recall_list is not None:
+            symbols |= set(self.recall_list)
+        symbols.discard(-1)
+        return symbols
+
+
+class RoundGenerator():
+
+    ''' Choose the symbols for a round in bounded time.
+
+    Rounds are drawn with set arithmetic and random.sample from an
+    injectable random.Random, so a seeded generator is reproducible, and
+    a pool too small for the level raises PoolTooSmall instead of
+    looping forever. '''
+
+    def __init__(self, rng=None):
+        self._random = rng if rng is not None else random.Random()
+
+    def _check(self, game, level, pool_size, needed):
+        if pool_size < needed:
+            raise PoolTooSmall(
+                'game %d level %d needs %d symbols; only %d available' %
+                (game, level, needed, pool_size))
+
+    def _offer(self, distractors, correct):
+        ''' Put the correct symbol among the distractors at random '''
+        answer = self._random.randrange(NUMBER_OF_OPTS)
+        options = list(distractors)
+        options.insert(answer, correct)
+        return options, answer
+
+    def new_round(self, game, level, pool_size):
+        ''' Generate a complete round '''
+        if game == N_BACK:
+            return self._n_back(level, pool_size)
+        if game == MISSING:
+            return self._missing(level, pool_size)
+        return self._repeated(game, level, pool_size)
+
+    def _repeated(self, game, level, pool_size):
+        # level - 1 different symbols, one of which appears twice
+        self._check(game, level, pool_size,
+                    max(level - 1, NUMBER_OF_OPTS))
+        dots = self._random.sample(range(pool_size), level - 1)
+        repeat = self._random.randrange(level)
+        dots.insert(repeat, self._random.choice(dots))
+        return self.options_for(game, level, pool_size, dots, repeat)
+
+    def _missing(self, level, pool_size):
+        self._check(MISSING, level, pool_size, level + 1)
+        dots = self._random.sample(range(pool_size), level)
+        return self.options_for(MISSING, level, pool_size, dots)
+
+    def _n_back(self, level, pool_size):
+        self._check(N_BACK, level, pool_size, RECALL_LENGTH)
+        recall_list = self._random.sample(range(pool_size), RECALL_LENGTH)
+        # The answer is an index into the recall list
+        target = len(recall_list) - int(level / 3) - 1
+        others = recall_list[:target] + recall_list[target + 1:]
+        distractors = self._random.sample(others, NUMBER_OF_OPTS - 1)
+        options, answer = self._offer(distractors, recall_list[target])
+        return Round([], options, answer, repeat=target,
+                     recall_list=recall_list)
+
+    def options_for(self, game, level, pool_size, dots, repeat=None):
+        ''' Generate the options for a given board '''
+        on_board = set(dots[:level]) - set([-1])
+        if game == MISSING:
+            candidates = sorted(on_board)
+            correct = self._random.choice(
+                sorted(set(range(pool_size)) - on_board))
+        else:
+            correct = dots[repeat]
+            if level == 3:  # Distractors may come from anywhere
+                candidates = sorted(set(range(pool_size)) - set([correct]))
+            else:  # Distractors come from the board
+                candidates = sorted(on_board - set([correct]))
+        if len(candidates) < NUMBER_OF_OPTS - 1:
+            raise PoolTooSmall('not enough symbols for the options')
+        distractors = self._random.sample(candidates, NUMBER_OF_OPTS - 1)
+        options, answer = self._offer(distractors, correct)
+        return Round(dots, options, answer, repeat=repeat)
+
+
+class Engine():
+
+    ''' The state machine for the Recall games '''
+
+    def __init__(self, pool_size, listener=None, rng=None,
+                 high_score=0):
+        ''' rng is an optional random.Random, e.g. seeded for tests '''
+        self.pool_size = pool_size
+        self._listener = listener
+        self._generator = RoundGenerator(rng)
+        self._round = None
+        self._next = None  # (game, level, pool_size, round) planned ahead
+        self.high_score = high_score
+        self.game = REPEATED
+        self.level = 3
+        self.correct = 0
+        self.correct_for_level = 0
+        self.dots = [-1] * NUMBER_OF_DOTS
+        self.opts = [-1] * NUMBER_OF_OPTS
+        self.answer = None
+        self.repeat = None
+        self.recall_list = []
+
+    def _emit(self, intent, *args):
+        if self._listener is not None:
+            self._listener(intent, *args)
+
+    def set_pool_size(self, pool_size):
+        ''' How many different symbols are there to choose from? '''
+        self.pool_size = pool_size
+
+    def reset(self, game):
+        ''' Switch to a game mode and start it from scratch '''
+        self.game = game
+        self.level = 3
+        self.correct = 0
+        self.correct_for_level = 0
+        self._next = None
+
+    def is_over(self):
+        ''' Has the player won this game? '''
+        return self.correct >= POINTS_TO_WIN
+
+    def _next_level(self, correct):
+        # Auto advance levels
+        if correct > 3 and self.level < NUMBER_OF_DOTS:
+            return self.level + 3
+        return self.level
+
+    def start_round(self):
+        ''' Things to reinitialize when starting up a new round. '''
+        level = self._next_level(self.correct)
+        if level != self.level:
+            self.level = level
+            self.correct_for_level = 0
+        self.dots = [-1] * NUMBER_OF_DOTS
+        self.opts = [-1] * NUMBER_OF_OPTS
+        self.answer = None
+        self.repeat = None
+        self._round = None
+        self._emit(CLEAR, self.level)
+
+    def _find_repeat(self):
+        ''' Find an image that repeats '''
+        seen = set()
+        for i in range(self.level):
+            if self.dots[i] in seen:
+                return i
+            seen.add(self.dots[i])
+        return None
+
+    def deal(self, restore=False):
+        ''' Choose the symbols for this round; when restoring, keep the
+        board and only choose the options. '''
+        if restore and self.game != N_BACK:
+            repeat = None
+            if self.game in [REPEATED, COLOR_REPEATED]:
+                # Find repeated image, as that is the answer
+                repeat = self._find_repeat()
+                if repeat is None:
+                    _logger.debug('could not find repeat')
+                    repeat = 0
+            self._round = self._generator.options_for(
+                self.game, self.level, self.pool_size, self.dots, repeat)
+        elif self._next is not None and \
+                self._next[:3] == (self.game, self.level, self.pool_size):
+            self._round = self._next[3]
+        else:
+            self._round = self._generator.new_round(
+                self.game, self.level, self.pool_size)
+        self._next = None
+
+        if self.game == N_BACK:
+            self.recall_list = self._round.recall_list
+            self._emit(RECALL, self.recall_list)
+            return
+        self.dots = (self._round.dots + [-1] * NUMBER_OF_DOTS)[
+            :NUMBER_OF_DOTS]
+        self.repeat = self._round.repeat
+        self._emit(DOTS, self.dots[:self.level])
+
+    def ask(self):
+        ''' Each game has a challenge '''
+        self.opts = list(self._round.options)
+        if self.game == N_BACK:
+            # The answer is an index into the recall list
+            self.answer = self._round.repeat
+        else:
+            self.answer = self._round.answer
+        self._emit(QUESTION, list(self.opts))
+
+    def plan_next(self):
+        ''' Choose the next round now, assuming this question is answered
+        correctly, so its images can be prepared while the player thinks.
+        Return the planned Round (or None). '''
+        points = 2 if self.game == N_BACK else 1
+        level = self._next_level(self.correct + points)
+        if self.correct + points >= POINTS_TO_WIN:
+            return None  # The game will be over
+        try:
+            plan = self._generator.new_round(self.game, level,
+                                             self.pool_size)
+        except PoolTooSmall:
+            return None
+        self._next = (self.game, level, self.pool_size, plan)
+        return plan
+
+    def choose(self, i):
+        ''' The player chose option i. Return True if it was correct. '''
+        reveal = None
+        if self.game == N_BACK:
+            reveal = self.recall_list[self.answer]
+            correct = self.opts[i] == reveal
+            points = 2
+        else:
+            correct = i == self.answer
+            points = 1
+        if correct:
+            self.correct += points
+            self.correct_for_level += 1
+        else:
+            self.correct_for_level = 0
+        self._round = None  # Answered; a saved game starts a new round
+        self._emit(ANSWER, i, correct, reveal)
+        return correct
+
+    def game_over(self):
+        ''' Report the score and start counting again '''
+        if self.correct > self.high_score:
+            self.high_score = self.correct
+        self._emit(GAME_OVER, self.correct, self.high_score)
+        score = self.correct
+        self.correct = 0
+        return score
+
+    def restore(self, dots, correct=0, level=3, game=REPEATED):
+        ''' Restore a saved game and deal its board again '''
+        self.correct = correct
+        self.level = level
+        self.game = game
+        self.dots = (list(dots) + [-1] * NUMBER_OF_DOTS)[:NUMBER_OF_DOTS]
+        self.deal(restore=True)
+
+    def snapshot(self, symbol_id=int):
+        ''' Return the game state as a dictionary of plain values, ready
+        for JSON. symbol_id maps symbols to what should be saved. '''
+        state = {'version': SNAPSHOT_VERSION,
+                 'game': self.game,
+                 'level': self.level,
+                 'correct': self.correct,
+                 'correct_for_level': self.correct_for_level,
+                 'round': None}
+        if self._round is not None:  # Dealt, but not yet answered
+            plan = self._round
+            recall_list = None
+            if plan.recall_list is not None:
+                recall_list = [symbol_id(n) for n in plan.recall_list]
+            state['round'] = {
+                'dots': [symbol_id(n) for n in plan.dots[:self.level]],
+                'options': [symbol_id(n) for n in plan.options],
+                'answer': plan.answer,
+                'repeat': plan.repeat,
+                'recall_list': recall_list}
+        return state
+
+    def resume(self, state, symbol_index=int):
+        ''' Pick up a snapshot, straight at the question, with no new
+        symbols chosen. Return False if no round was in progress. Raise
+        ValueError if the snapshot cannot be used. '''
+        if not isinstance(state, dict) or \
+           state.get('version') != SNAPSHOT_VERSION:
+            raise ValueError('unknown snapshot version')
+        if state.get('game') not in GAMES:
+            raise ValueError('unknown game in snapshot')
+        self.reset(int(state['game']))
+        self.level = int(state['level'])
+        if self.level < 3 or self.level > NUMBER_OF_DOTS:
+            raise ValueError('bad level in snapshot')
+        self.correct = int(state['correct'])
+        self.correct_for_level = int(state.get('correct_for_level', 0))
+        saved = state.get('round')
+        if saved is None:
+            return False
+
+        def symbols(values):
+            result = [symbol_index(n) for n in values]
+            for n in result:
+                if n < 0 or n >= self.pool_size:
+                    raise ValueError('unknown symbol in snapshot')
+            return result
+
+        options = symbols(saved['options'])
+        if len(options) != NUMBER_OF_OPTS:
+            raise ValueError('wrong number of options in snapshot')
+        recall_list = None
+        if self.game == N_BACK:
+            recall_list = symbols(saved['recall_list'])
+            if saved['repeat'] not in range(len(recall_list)) or \
+               recall_list[saved['repeat']] not in options:
+                raise ValueError('bad n-back answer in snapshot')
+        elif saved['answer'] not in range(NUMBER_OF_OPTS):
+            raise ValueError('bad answer in snapshot')
+        dots = symbols(saved['dots'])
+        if self.game != N_BACK and len(dots) != self.level:
+            raise ValueError('board does not match level in snapshot')
+        self._round = Round(dots, options, saved['answer'],
+                            repeat=saved['repeat'], recall_list=recall_list)
+        self.dots = (dots + [-1] * NUMBER_OF_DOTS)[:NUMBER_OF_DOTS]
+        self.repeat = saved['repeat']
+        self.recall_list = recall_list or []
+        self._emit(CLEAR, self.level)
+        if self.game != N_BACK:  # Shown again when the answer is revealed
+            self._emit(DOTS, self.dots[:self.level])
+        self.ask()
+        return True
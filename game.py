@@ -11,21 +11,33 @@
 # Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
 
 '''
-Three different games:
+Four different games:
 (0) find the repeated image
 (1) find the image not shown in the collection
 (2) recall the image shown previously
+(3) find the repeated image, where images come in different colors
 '''
 
 from sprites import Sprites, Sprite
+from surface_cache import SurfaceCache, MAX_BYTES, image_file_to_surface, \
+    dot_surface, hex_to_rgb
+from tint import tint_surface, TINTS
+from preload import Preloader
+from atlas import Atlas
+from disk_cache import DiskCache
+from timeline import Timeline
+from scores import ScoreStore
+import engine
+from sugar3.bundle.activitybundle import ActivityBundle
+from manifest import load_manifest
 from sugar3.graphics import style
 from gi.repository import GdkPixbuf
-from gi.repository import GLib
 from gi.repository import Gdk
 from gi.repository import Gtk
 from sugar3.activity.activity import get_activity_root
 import cairo
 import os
+import time
 from random import uniform
 
 from gettext import gettext as _
@@ -38,6 +50,11 @@ GRID_CELL_SIZE = style.GRID_CELL_SIZE
 
 DOT_SIZE = 40
 
+# The question banner and Game Over rings rarely change, so they live
+# below the dots, in the layers Sprites retains in its back buffer.
+BANNER_LAYER = 50
+DOT_LAYER = 100
+
 
 def glob(path, end):
     files = []
@@ -48,14 +65,26 @@ def glob(path, end):
     return files
 
 
+def _bundle_version(path):
+    ''' Return the activity version, so caches can detect updates '''
+    try:
+        return ActivityBundle(path).get_activity_version()
+    except Exception:
+        return '0'
+
+
 class Game():
 
     def __init__(self, canvas, parent=None, path=None,
-                 colors=['#A0FFA0', '#FF8080']):
+                 colors=['#A0FFA0', '#FF8080'], cache_size=MAX_BYTES,
+                 checkpoint=None, session_log=None):
         self._canvas = canvas
         self._parent = parent
         self._parent.show_all()
         self._path = path
+        self._checkpoint = checkpoint
+        self._session_log = session_log
+        self._question_time = None
 
         self._colors = ['#FFFFFF']
         self._colors.append(colors[0])
@@ -71,22 +100,33 @@ class Game():
         self._scale = self._height / (4 * DOT_SIZE * 1.3)
         self._dot_size = int(DOT_SIZE * self._scale)
         self._space = int(self._dot_size / 5.)
+        self._surface_cache = SurfaceCache(max_bytes=cache_size)
+        self._preloader = None
+        self._prefetcher = None
+        self._atlas = None
+        self._disk_cache = DiskCache(
+            os.path.join(get_activity_root(), 'data', 'surfaces'),
+            self._dot_size, (Gdk.Screen.width(), Gdk.Screen.height()),
+            _bundle_version(self._path))
 
         self._start_time = 0
-        self._timeout_id = None
-
-        self._level = 3
-        self._game = 0
-        self._correct = 0
-        self._correct_for_level = 0
-        self._high_score_count = self.load_highscore()
+        self._timeline = Timeline(self._canvas)
+        self._log_draw = False
 
         # Find the image files
-        self._PATHS = glob(os.path.join(self._path, 'images'), '.png')
-        self._CPATHS = glob(os.path.join(self._path, 'color-images'), '*.svg')
+        self._load_images(os.path.join(self._path, 'images'))
+
+        # Read once; written in the background after every game
+        self._scores = ScoreStore(os.path.join(get_activity_root(), 'data'))
+
+        # The rules of the game live in the engine; Game shows the results
+        self._engine = engine.Engine(
+            len(self._PATHS), listener=self._render,
+            high_score=self._scores.get_high_score(engine.REPEATED))
 
         # Generate the sprites we'll need...
         self._sprites = Sprites(self._canvas)
+        self._sprites.set_retained(True, below=DOT_LAYER, background=(1, 1, 1))
         self._dots = []
         self._opts = []
         self._question = []
@@ -128,16 +168,80 @@ class Game():
             self._question[-1].set_label_attributes(72)
             self._question[-1].hide()
 
+        self._create_overlays()
+
+    def _load_images(self, image_path):
+        ''' Read the image list from the manifest written at build time '''
+        entries = load_manifest(image_path)
+        if entries is None:
+            # Running from a source tree: fall back to a sorted scan.
+            _logger.debug('no image manifest; scanning %s' % (image_path))
+            entries = []
+            for i, path in enumerate(sorted(glob(image_path, '.png'))):
+                entries.append({'id': i, 'file': os.path.basename(path)})
+        self._PATHS = []
+        self._IDS = []
+        self._ID_INDEX = {}
+        for entry in entries:
+            self._ID_INDEX[entry['id']] = len(self._PATHS)
+            self._PATHS.append(os.path.join(image_path, entry['file']))
+            self._IDS.append(entry['id'])
+
+    def _image_id(self, n):
+        ''' Convert an image index to its stable manifest id '''
+        if n is None or n < 0:
+            return -1
+        if self._engine.game == engine.COLOR_REPEATED:  # image and tint
+            return self._IDS[n // len(TINTS)] * len(TINTS) + n % len(TINTS)
+        return self._IDS[n]
+
+    def _image_index(self, image_id):
+        ''' Convert a stable manifest id to an image index '''
+        if image_id is None or image_id < 0:
+            return -1
+        if self._engine.game == engine.COLOR_REPEATED:
+            i = self._ID_INDEX.get(image_id // len(TINTS), -1)
+            if i == -1:
+                return -1
+            return i * len(TINTS) + image_id % len(TINTS)
+        return self._ID_INDEX.get(image_id, -1)
+
+    def _pool_size(self):
+        ''' How many different symbols can the current game show? '''
+        if self._engine.game == engine.COLOR_REPEATED:
+            return len(self._PATHS) * len(TINTS)
+        return len(self._PATHS)
+
+    def _symbol_surface(self, n):
+        ''' Return the surface for symbol n in the current game '''
+        if self._engine.game == engine.COLOR_REPEATED:
+            return self._new_dot_surface(color_image=n)
+        return self._new_dot_surface(image=n)
+
+    def _render(self, intent, *args):
+        ''' Show the player what the engine did '''
+        if intent == engine.CLEAR:
+            self._show_clear(*args)
+        elif intent == engine.DOTS:
+            self._show_dots(*args)
+        elif intent == engine.RECALL:
+            self._show_recall(*args)
+        elif intent == engine.QUESTION:
+            self._show_question(*args)
+        elif intent == engine.ANSWER:
+            self._show_answer(*args)
+        elif intent == engine.GAME_OVER:
+            self._show_game_over(*args)
+
     def _all_clear(self):
         ''' Things to reinitialize when starting up a new game. '''
-        if self._timeout_id is not None:
-            GLib.source_remove(self._timeout_id)
-
-        # Auto advance levels
-        if self._correct > 3 and self._level < len(self._dots):
-            self._level += 3
-            self._correct_for_level = 0
+        self._timeline.cancel()
+        with self._sprites.batch():
+            self._engine.start_round()
+        self._dance_counter = 0
+        self._dance_step()
 
+    def _show_clear(self, level):
         self._set_label('')
         for question_shape in self._question:
             question_shape.hide()
@@ -149,181 +253,109 @@ class Game():
             highscore_shape.hide()
         for i in range(3):
             self._opts[i].hide()
-            self._opts[i].type = -1
             self._opts[i].set_label('')
 
-        for dot in self._dots:
-            dot.type = -1
-            if self._game == 2 or self._dots.index(dot) < self._level:
-                dot.set_shape(self._new_dot_surface(
-                    self._colors[abs(dot.type)]))
+        for i, dot in enumerate(self._dots):
+            if self._engine.game == engine.N_BACK or i < level:
+                dot.set_shape(self._new_dot_surface(self._colors[1]))
                 dot.set_label('?')
-                dot.set_layer(100)
+                dot.set_layer(DOT_LAYER)
             else:
                 dot.hide()
 
-        self._dance_counter = 0
-        self._dance_step()
-
     def _dance_step(self):
         ''' Short animation before loading new game '''
-        if self._game == 2:
-            for i in range(len(self._dots)):
-                self._dots[i].set_shape(self._new_dot_surface(
-                    self._colors[int(uniform(0, 3))]))
-        else:
-            for i in range(self._level):
-                self._dots[i].set_shape(self._new_dot_surface(
+        with self._sprites.batch():
+            if self._engine.game == engine.N_BACK:
+                dance_dots = self._dots
+            else:
+                dance_dots = self._dots[:self._engine.level]
+            for dot in dance_dots:
+                dot.set_shape(self._new_dot_surface(
                     self._colors[int(uniform(0, 3))]))
         self._dance_counter += 1
         if self._dance_counter < 10:
-            self._timeout_id = GLib.timeout_add(500, self._dance_step)
+            self._timeline.after(500, self._dance_step)
         else:
             self._new_game()
 
     def new_game(self, game=None, restart=True):
         ''' Start a new game. '''
         if game is not None:
-            self._game = game
-            self._level = 3
-            self._correct = 0
-            self._correct_for_level = 0
+            self._engine.reset(game)
+            self._engine.set_pool_size(self._pool_size())
+            self._engine.high_score = self._scores.get_high_score(game)
         if restart:
-            if self._correct < 10:
+            if not self._engine.is_over():
                 self._all_clear()
             else:
                 self._game_over()
 
-    def _image_in_dots(self, n):
-        for i in range(self._level):
-            if self._dots[i].type == n:
-                return True
-        return False
+    def _new_game(self, restore=None):
+        ''' Load game images and then ask a question... '''
+        with self._sprites.batch():
+            if restore is None:
+                self._engine.deal()
+            else:
+                self._engine.restore(*restore)
+        if self._engine.game != engine.N_BACK:
+            self._timeline.after(3000, self._ask_the_question)
+
+    def _show_dots(self, dots):
+        for i, dot in enumerate(self._dots):
+            if i < len(dots) and dots[i] != -1:
+                dot.set_shape(self._symbol_surface(dots[i]))
+                dot.set_layer(DOT_LAYER)
+                dot.set_label('')
+            else:
+                dot.hide()
 
-    def _image_in_opts(self, n):
-        for i in range(3):
-            if self._opts[i].type == n:
-                return True
-        return False
-
-    def _choose_random_images(self):
-        ''' Choose images at random '''
-        maxi = len(self._PATHS)
-        for i in range(self._level):
-            if self._dots[i].type == -1:
-                n = int(uniform(0, maxi))
-                while self._image_in_dots(n):
-                    n = int(uniform(0, maxi))
-                self._dots[i].type = n
-            self._dots[i].set_shape(self._new_dot_surface(
-                    image=self._dots[i].type))
-            self._dots[i].set_layer(100)
-            self._dots[i].set_label('')
+    def _show_recall(self, recall_list):
+        self._recall_counter = 0
+        self._load_image_from_list()
 
     def _load_image_from_list(self):
-        if self._recall_counter == len(self._recall_list):
-            self._timeout_id = GLib.timeout_add(
-                1000, self._ask_the_question)
+        recall_list = self._engine.recall_list
+        if self._recall_counter == len(recall_list):
+            self._timeline.after(1000, self._ask_the_question)
             return
-        for dot in self._dots:
-            dot.type = self._recall_list[self._recall_counter]
-            dot.set_shape(self._new_dot_surface(image=dot.type))
-            dot.set_layer(100)
-            dot.set_label('')
+        with self._sprites.batch():
+            for dot in self._dots:
+                dot.set_shape(self._symbol_surface(
+                    recall_list[self._recall_counter]))
+                dot.set_layer(DOT_LAYER)
+                dot.set_label('')
         self._recall_counter += 1
-        self._timeout_id = GLib.timeout_add(
-            1000, self._load_image_from_list)
-
-    def _find_repeat(self):
-        ''' Find an image that repeats '''
-        for i in range(self._level):
-            for j in range(self._level - i - 1):
-                if self._dots[i].type == self._dots[j].type:
-                    return i
-        return None
-
-    def _new_game(self, restore=False):
-        ''' Load game images and then ask a question... '''
-        if self._game in [0, 1]:
-            self._choose_random_images()
-        else:  # game 2
-            # generate a random list
-            self._recall_list = []
-            for i in range(12):
-                n = int(uniform(0, len(self._PATHS)))
-                while n in self._recall_list:
-                    n = int(uniform(0, len(self._PATHS)))
-                self._recall_list.append(n)
-            self._recall_counter = 0
-            self._load_image_from_list()
-
-        if self._game == 0:
-            if not restore:
-                # Repeat at least one of the images
-                self._repeat = int(uniform(0, self._level))
-                n = (self._repeat + int(uniform(1, self._level))) % self._level
-                _logger.debug('repeat=%d, n=%d' % (self._repeat, n))
-                self._dots[self._repeat].set_shape(self._new_dot_surface(
-                    image=self._dots[n].type))
-                self._dots[self._repeat].type = self._dots[n].type
-            else:  # Find repeated image, as that is the answer
-                self._repeat = self._find_repeat()
-                if self._repeat is None:
-                    _logger.debug('could not find repeat')
-                    self._repeat = 0
-
-        if self._game in [0, 1]:
-            self._timeout_id = GLib.timeout_add(
-                3000, self._ask_the_question)
+        self._timeline.after(1000, self._load_image_from_list)
 
     def _ask_the_question(self):
         ''' Each game has a challenge '''
-        self._timeout_id = None
+        with self._sprites.batch():
+            self._engine.ask()
+        self._log_question()
+        # While the player thinks, get the next round ready
+        self._prefetch_next_round()
+
+    def _show_question(self, opts):
         for i in range(3):
             self._opts[i].set_label('')
         # Hide the dots
-        if self._game == 2:
+        if self._engine.game == engine.N_BACK:
             for dot in self._dots:
                 dot.hide()
         else:
-            for i in range(self._level):
+            for i in range(self._engine.level):
                 self._dots[i].hide()
 
-        if self._game == 0:
-            text = []
-            text.append("¿")
-            text.append("    recall   ")
-            text.append(" repeated ")
-            text.append("   image   ")
-            text.append("?")
-            i = 0
-            for question_shape in self._question:
-                question_shape.type = -1
-                question_shape.set_shape(self._new_dot_surface(
-                    self._colors[2]))
-                question_shape.set_label(text[i])
-                question_shape.set_layer(100)
-                i += 1
-            # Show the possible solutions
-            for i in range(3):
-                n = int(uniform(0, len(self._PATHS)))
-                if self._level == 3:
-                    while(n == self._dots[self._repeat].type or
-                          self._image_in_opts(n)):
-                        n = int(uniform(0, len(self._PATHS)))
-                else:
-                    while(n == self._dots[self._repeat].type or
-                          not self._image_in_dots(n) or
-                          self._image_in_opts(n)):
-                        n = int(uniform(0, len(self._PATHS)))
-                self._opts[i].type = n
-            self._answer = int(uniform(0, 3))
-            self._opts[self._answer].type = self._dots[self._repeat].type
-            for i in range(3):
-                self._opts[i].set_shape(self._new_dot_surface(
-                    image=self._opts[i].type))
-                self._opts[i].set_layer(100)
-        elif self._game == 1:
+        if self._engine.game in [engine.REPEATED, engine.COLOR_REPEATED]:
+            text = [
+                "¿",
+                "    recall   ",
+                " repeated ",
+                "   image   ",
+                "?"
+            ]
+        elif self._engine.game == engine.MISSING:
             text = [
                 "¿",
                 "    recall   ",
@@ -331,90 +363,103 @@ class Game():
                 "   image   ",
                 "?"
             ]
-            i = 0
-            for question_shape in self._question:
-                question_shape.type = -1
-                question_shape.set_shape(self._new_dot_surface(
-                    self._colors[2]))
-                question_shape.set_label(text[i])
-                question_shape.set_layer(100)
-                i += 1
-            # Show the possible solutions
-            for i in range(3):
-                n = int(uniform(0, len(self._PATHS)))
-                while(not self._image_in_dots(n) or
-                      self._image_in_opts(n)):
-                    n = int(uniform(0, len(self._PATHS)))
-                self._opts[i].type = n
-            self._answer = int(uniform(0, 3))
-            n = int(uniform(0, len(self._PATHS)))
-            while(self._image_in_dots(n)):
-                n = int(uniform(0, len(self._PATHS)))
-            self._opts[self._answer].type = n
-            for i in range(3):
-                self._opts[i].set_shape(self._new_dot_surface(
-                    image=self._opts[i].type))
-                self._opts[i].set_layer(100)
-        elif self._game == 2:
+        else:
             text = [
                 "¿",
                 "   what was ",
-                " displayed " + (str(int(self._level / 3))) + " ",
+                " displayed " + (str(int(self._engine.level / 3))) + " ",
                 " time(s) ago  ",
                 "?"
             ]
-
-            i = 0
-            for question_shape in self._question:
-                question_shape.type = -1
-                question_shape.set_shape(self._new_dot_surface(
-                    self._colors[2]))
-                question_shape.set_label(text[i])
-                question_shape.set_layer(100)
-                i += 1
-            # Show the possible solutions
-            for i in range(3):
-                self._answer = len(self._recall_list) - \
-                    int(self._level / 3) - 1
-                n = int(uniform(0, len(self._recall_list)))
-                while n == self._answer:
-                    n = int(uniform(0, len(self._recall_list)))
-                self._opts[i].type = n
-            i = int(uniform(0, 3))
-            self._opts[i].type = self._recall_list[self._answer]
-            for i in range(3):
-                self._opts[i].set_shape(self._new_dot_surface(
-                    image=self._opts[i].type))
-                self._opts[i].set_layer(100)
-        else:
-            for question_shape in self._question:
-                question_shape.hide()
+        for i, question_shape in enumerate(self._question):
+            question_shape.set_shape(self._new_dot_surface(self._colors[2]))
+            question_shape.set_label(text[i])
+            question_shape.set_layer(BANNER_LAYER)
+        # Show the possible solutions
+        for i in range(3):
+            self._opts[i].set_shape(self._symbol_surface(opts[i]))
+            self._opts[i].set_layer(DOT_LAYER)
+
+    def resume_game(self, snapshot):
+        ''' Resume a game saved by save_game(), straight at the question '''
+        self._timeline.cancel()
+        try:
+            game = int(snapshot['game'])
+        except (KeyError, TypeError, ValueError):
+            game = None
+        if game not in engine.GAMES:
+            _logger.error('could not resume saved game: unknown game')
+            self.new_game(game=engine.REPEATED)
+            return
+        try:
+            self._engine.game = game  # For the image id conversions
+            self._engine.set_pool_size(self._pool_size())
+            with self._sprites.batch():
+                resumed = self._engine.resume(snapshot, self._image_index)
+        except (KeyError, TypeError, ValueError) as e:
+            _logger.error('could not resume saved game: %s' % (e))
+            self.new_game(game=game)
+            return
+        self._engine.high_score = self._scores.get_high_score(game)
+        if resumed:
+            self._log_question()
+            self._prefetch_next_round()
+        else:  # Saved between rounds
+            self.new_game()
 
     def restore_game(self, dot_list, correct=0, level=3, game=0):
-        ''' Restore a game from the Journal '''
-        # TODO: Save/restore recall list for game 2
-        self._correct = correct
-        self._level = level
-        self._game = game
-        for i, dot in enumerate(dot_list):
-            self._dots[i].type = dot
-            if dot == -1:
-                self._dots[i].hide()
-        self._new_game(restore=True)
+        ''' Restore a board saved by older versions of Recall '''
+        self._engine.game = game
+        self._engine.set_pool_size(self._pool_size())
+        self._engine.high_score = self._scores.get_high_score(game)
+        dots = [self._image_index(dot) for dot in dot_list]
+        self._new_game(restore=(dots, correct, level, game))
 
     def save_game(self):
-        ''' Return dot list for saving to Journal '''
-        dot_list = []
-        for dot in self._dots:
-            dot_list.append(dot.type)
-        return dot_list, self._correct, self._level, self._game
+        ''' Return the game state (with stable image ids) for the Journal '''
+        return self._engine.snapshot(self._image_id)
+
+    def _log_question(self):
+        ''' Record what was shown and what is being asked '''
+        self._question_time = time.monotonic()
+        if self._session_log is None:
+            return
+        if self._engine.game == engine.N_BACK:
+            shown = self._engine.recall_list
+            answer = self._engine.opts.index(
+                self._engine.recall_list[self._engine.answer])
+        else:
+            shown = self._engine.dots[:self._engine.level]
+            answer = self._engine.answer
+        self._session_log.record(
+            'question', game=self._engine.game, level=self._engine.level,
+            shown=[self._image_id(n) for n in shown],
+            options=[self._image_id(n) for n in self._engine.opts],
+            answer=answer)
+
+    def _log_answer(self, choice, correct):
+        ''' Record the option chosen and how long it took '''
+        if self._session_log is None:
+            return
+        reaction = None
+        if self._question_time is not None:
+            reaction = int((time.monotonic() - self._question_time) * 1000)
+        self._session_log.record(
+            'answer', game=self._engine.game, level=self._engine.level,
+            choice=choice, correct=correct, reaction_ms=reaction,
+            score=self._engine.correct)
+
+    def _save_checkpoint(self):
+        ''' Hand the game state to the crash-recovery checkpoint '''
+        if self._checkpoint is not None:
+            self._checkpoint.save(self.save_game())
 
     def _set_label(self, string):
         ''' Set the label in the toolbar or the window frame. '''
         self._parent.status.set_label(string)
 
     def _button_press_cb(self, win, event):
-        if self._timeout_id is not None:
+        if self._timeline.is_busy():
             _logger.debug('still in timeout... ignoring click')
             return
         for question_shape in self._question:
@@ -423,83 +468,83 @@ class Game():
         x, y = list(map(int, event.get_coords()))
 
         spr = self._sprites.find_sprite((x, y))
-        if spr == None:
+        if spr not in self._opts:
             return
-        current = self._correct
-        if self._game in [0, 1]:
-            for i in range(3):
-                if self._opts[i] == spr:
-                    break
-            self._opts[i].set_shape(self._new_dot_surface(
-                color=self._colors[0]))
-            if i == self._answer:
-                self._opts[i].set_label('☻')
-                self._correct += 1
-                self._correct_for_level += 1
-            else:
-                self._opts[i].set_label('☹')
-                self._correct_for_level = 0
+        choice = self._opts.index(spr)
+        with self._sprites.batch():
+            correct = self._engine.choose(choice)
+        self._log_answer(choice, correct)
+        self._save_checkpoint()
+        if correct:
+            self._timeline.after(1000, self.new_game)
         else:
-            for i in range(3):
-                if self._opts[i] == spr:
-                    break
-            self._opts[i].set_shape(self._new_dot_surface(
-                color=self._colors[0]))
-            if self._opts[i].type == self._recall_list[self._answer]:
-                self._opts[i].set_label('☻')
-                self._correct += 2
-                self._correct_for_level += 1
-            else:
-                self._opts[i].set_label('☹')
-                self._correct_for_level = 0
+            self._timeline.after(2000, self._game_over)
+        return True
 
-        if self._game in [0, 1]:
-            for i in range(self._level):
-                self._dots[i].set_layer(100)
+    def _show_answer(self, i, correct, reveal):
+        self._opts[i].set_shape(self._new_dot_surface(color=self._colors[0]))
+        if correct:
+            self._opts[i].set_label('☻')
+        else:
+            self._opts[i].set_label('☹')
+
+        if self._engine.game != engine.N_BACK:
+            for i in range(self._engine.level):
+                self._dots[i].set_layer(DOT_LAYER)
         else:
             for question_shape in self._question:
                 question_shape.hide()
             for dot in self._dots:
-                dot.set_shape(self._new_dot_surface(
-                    image=self._recall_list[self._answer]))
-                dot.set_layer(100)
-
-        if self._correct > current:
-            self._timeout_id = GLib.timeout_add(1000, self.new_game)
-        else:
-            self._timeout_id = GLib.timeout_add(2000, self._game_over)
-        return True
+                dot.set_shape(self._symbol_surface(reveal))
+                dot.set_layer(DOT_LAYER)
 
     def _game_over(self):
+        with self._sprites.batch():
+            self._engine.game_over()
+        self._save_checkpoint()
+        self._timeline.after(5000, self.new_game)
+
+    def _show_game_over(self, score, high_score):
         for opt in self._opts:
             opt.hide()
-            opt.type = -1
         for dot in self._dots:
             dot.hide()
         for question_shape in self._question:
             question_shape.hide()
-        self.save_highscore()
+        self._scores.record(self._engine.game, self._engine.level, score)
+        text = [
+            "☻",
+            "  Game  ",
+            "  Over  ",
+            "☻"
+        ]
+        self.rings(len(text), text, self._gameover)
+        text = [
+            "  your  ",
+            " score:  ",
+            (f"  {score}  ")
+        ]
+        self.rings(len(text), text, self._score)
+        text = [
+            "  high  ",
+            " score:  ",
+            (f"  {high_score}  ")
+        ]
+        self.rings(len(text), text, self._highscore)
+
+    def _create_overlays(self):
+        ''' The Game Over, score and high score rings are made once (hidden)
+        and reused, with new labels, at the end of every game. '''
         yoffset = int(self._space / 4.)
         xoffset = int((self._width - 6 * self._dot_size -
                        5 * self._space) / 2.)
         y = 1
-        i = 0
         for x in range(2, 6):
             self._gameover.append(
                 Sprite(self._sprites,
                        xoffset + (x - 0.25) * (self._dot_size - 15),
                        y * (self._dot_size - 90 + self._space) + yoffset,
                        self._new_dot_surface(color=self._colors[1])))
-            self._gameover[-1].type = -1  # No image
-            self._gameover[-1].set_label_attributes(72)
-            i += 1
-        text = [
-            "☻",
-            "  Game  ",
-            "  Over  ",
-            "☻"
-        ]
-        self.rings(len(text), text, self._gameover)
         y = 2
         for x in range(2, 5):
             self._score.append(
@@ -507,34 +552,18 @@ class Game():
                        xoffset + (x + 0.25) * (self._dot_size - 15),
                        y * (self._dot_size - 30 + self._space) + yoffset,
                        self._new_dot_surface(color=self._colors[1])))
-            self._score[-1].type = -1  # No image
-            self._score[-1].set_label_attributes(72)
-        text = [
-            "  your  ",
-            " score:  ",
-            (f"  {self._correct}  ")
-        ]
-        self.rings(len(text), text, self._score)
-        y = 3   
-        if self._correct > self._high_score_count:
-            self._high_score_count = self._correct
+        y = 3
         for x in range(2, 5):
             self._highscore.append(
                 Sprite(self._sprites,
                        xoffset + (x + 0.25) * (self._dot_size - 15),
                        y * (self._dot_size - 20 + self._space) + yoffset,
                        self._new_dot_surface(color=self._colors[1])))
-            self._highscore[-1].type = -1  # No image
-            self._highscore[-1].set_label_attributes(72)
-        text = [
-            "  high  ",
-            " score:  ",
-            (f"  {self._high_score_count}  ")
-        ]
-        self.rings(len(text), text, self._highscore)
-        self._correct = 0
-        self._timeout_id = GLib.timeout_add(5000, self.new_game)
-        
+        for shape in self._gameover + self._score + self._highscore:
+            shape.type = -1  # No image
+            shape.set_label_attributes(72)
+            shape.hide()
+
     def rings(self, num, text, shape):
         i = 0
         for x in range(num):
@@ -542,7 +571,7 @@ class Game():
             shape[x].set_shape(self._new_dot_surface(
                         self._colors[2]))
             shape[x].set_label(text[i])
-            shape[x].set_layer(100)
+            shape[x].set_layer(BANNER_LAYER)
             i += 1 
 
     def _draw_cb(self, win, context):
@@ -550,63 +579,173 @@ class Game():
 
     def do_draw(self, win, cr):
         ''' Handle the draw-event by drawing '''
-        # Restrict Cairo to the exposed area
-        alloc = win.get_allocation()
-        cr.rectangle(0, 0, alloc.width, alloc.height)
-        cr.set_source_rgb(1, 1, 1)
-        cr.fill()
-
-        cr.rectangle(0, 0, alloc.width, alloc.height)
-        cr.clip()
-        # Refresh sprite list
-        self._sprites.redraw_sprites(cr=cr)
+        # Only repaint the exposed area
+        try:
+            area = cr.copy_clip_rectangle_list()
+        except cairo.Error:  # Clip is not representable as rectangles
+            x1, y1, x2, y2 = cr.clip_extents()
+            area = [cairo.Rectangle(x1, y1, x2 - x1, y2 - y1)]
+
+        # Refresh sprite list (the white background is part of the
+        # retained back buffer)
+        count = self._sprites.redraw_sprites(area=area, cr=cr)
+        if self._log_draw:
+            pixels = sum([int(r.width * r.height) for r in area])
+            _logger.debug('draw: %d rectangles, %d pixels, %d sprites' %
+                          (len(area), pixels, count))
+
+    def set_log_draw(self, state):
+        ''' Log how much of the screen each frame repaints '''
+        self._log_draw = state
 
     def _destroy_cb(self, win, event):
         Gtk.main_quit()
 
     def _new_dot_surface(self, color='#000000', image=None, color_image=None):
         ''' generate a dot of a color color '''
-        self._dot_cache = {}
         if color_image is not None:
-            if color_image + 10000 in self._dot_cache:
-                return self._dot_cache[color_image + 10000]
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(
-                os.path.join(self._path, self._CPATHS[color_image]),
-                self._svg_width, self._svg_height)
+            key = ('color-image', color_image, self._dot_size)
         elif image is not None:
-            if image in self._dot_cache:
-                return self._dot_cache[image]
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(
-                os.path.join(self._path, self._PATHS[image]),
-                self._svg_width, self._svg_height)
+            key = ('image', image, self._dot_size)
         else:
-            if color in self._dot_cache:
-                return self._dot_cache[color]
-            self._stroke = color
-            self._fill = color
-            self._svg_width = self._dot_size
-            self._svg_height = self._dot_size
-
-            # i = self._colors.index(color)
-            pixbuf = svg_str_to_pixbuf(
-                self._header() +
-                self._circle(self._dot_size / 2., self._dot_size / 2.,
-                             self._dot_size / 2.) +
-                self._footer())
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
-                                     self._svg_width, self._svg_height)
-        context = cairo.Context(surface)
-        Gdk.cairo_set_source_pixbuf(context, pixbuf, 0, 0)
-        context.rectangle(0, 0, self._svg_width, self._svg_height)
-        context.fill()
+            key = ('color', color, self._dot_size)
+        if self._atlas is not None and key in self._atlas:
+            return self._atlas.get_region(key)
+        surface = self._surface_cache.get(key)
+        if surface is not None:
+            return surface
+
+        self._svg_width = self._dot_size
+        self._svg_height = self._dot_size
         if color_image is not None:
-            self._dot_cache[color_image + 10000] = surface
+            # One decode of the base image, then a cheap recoloring pass
+            surface = tint_surface(
+                self._new_dot_surface(image=color_image // len(TINTS)),
+                hex_to_rgb(TINTS[color_image % len(TINTS)]))
         elif image is not None:
-            self._dot_cache[image] = surface
+            path = os.path.join(self._path, self._PATHS[image])
+            surface = self._disk_cache.load(path)
+            if surface is None:
+                surface = image_file_to_surface(
+                    path, self._svg_width, self._svg_height)
+                self._disk_cache.store(path, surface)
         else:
-            self._dot_cache[color] = surface
+            surface = dot_surface(color, self._dot_size)
+        self._surface_cache.put(key, surface)
         return surface
 
+    def _prefetch_next_round(self):
+        ''' Plan the next round and decode its images in the background '''
+        if self._prefetcher is not None:
+            self._prefetcher.cancel()
+            self._prefetcher = None
+        plan = self._engine.plan_next()
+        if plan is None:
+            return
+        tinted = []
+        jobs = []
+        for n in sorted(plan.get_symbols()):
+            if self._engine.game == engine.COLOR_REPEATED:
+                tinted.append(n)
+                n = n // len(TINTS)
+            key = ('image', n, self._dot_size)
+            if (self._atlas is not None and key in self._atlas) or \
+                    key in self._surface_cache:
+                continue
+            if self._preloader is not None and \
+                    self._preloader.is_pending(key):
+                continue  # Already on its way from the start-up preload
+            path = os.path.join(self._path, self._PATHS[n])
+            surface = self._disk_cache.load(path)
+            if surface is not None:
+                self._surface_cache.put(key, surface)
+            else:
+                jobs.append((key, path))
+
+        def prefetched(done, total):
+            if done == total:
+                # Tinting is cheap, so it is done here on the main loop;
+                # images still being preloaded are tinted when needed.
+                for n in tinted:
+                    key = ('image', n // len(TINTS), self._dot_size)
+                    if self._preloader is None or \
+                            not self._preloader.is_pending(key):
+                        self._new_dot_surface(color_image=n)
+
+        self._prefetcher = Preloader(self._surface_cache, self._dot_size,
+                                     store=self._disk_cache.store)
+        self._prefetcher.start(jobs, progress_cb=prefetched)
+
+    def preload_images(self, progress_cb=None):
+        ''' Decode the image set in the background at the current size '''
+        if self._preloader is not None:
+            self._preloader.cancel()
+        self._preloader = Preloader(self._surface_cache, self._dot_size,
+                                    store=self._disk_cache.store)
+        jobs = []
+        for i, path in enumerate(self._PATHS):
+            key = ('image', i, self._dot_size)
+            path = os.path.join(self._path, path)
+            # Pre-scaled pixels from a previous launch need no decoding
+            surface = self._disk_cache.load(path)
+            if surface is not None:
+                self._surface_cache.put(key, surface)
+            else:
+                jobs.append((key, path))
+        self._preload_cb = progress_cb
+        self._preloader.start(jobs, progress_cb=self._preload_progress_cb)
+
+    def _preload_progress_cb(self, done, total):
+        if done == total:
+            self._disk_cache.save_index()
+            self.build_atlas()
+        if self._preload_cb is not None:
+            self._preload_cb(done, total)
+
+    def build_atlas(self):
+        ''' Pack the images and dot colors into one shared surface '''
+        self._atlas = None
+        surfaces = {}
+        for color in self._colors:
+            key = ('color', color, self._dot_size)
+            surfaces[key] = self._new_dot_surface(color=color)
+        for i in range(len(self._PATHS)):
+            key = ('image', i, self._dot_size)
+            surfaces[key] = self._new_dot_surface(image=i)
+        self._atlas = Atlas(surfaces)
+        # The atlas now owns the pixels
+        for key in surfaces:
+            self._surface_cache.discard(key)
+        _logger.debug('atlas: %d regions, %d bytes' %
+                      (len(self._atlas), self._atlas.get_size()))
+
+    def get_preload_progress(self):
+        ''' Return (done, total) for the background image decode '''
+        if self._preloader is None:
+            return 0, 0
+        return self._preloader.get_progress()
+
+    def is_preload_ready(self):
+        ''' Have all of the images been decoded? '''
+        return self._preloader is not None and self._preloader.is_ready()
+
+    def save_caches(self):
+        ''' Write out anything the caches have not yet saved '''
+        self._disk_cache.save_index()
+        self._scores.flush(timeout=1)
+        if self._checkpoint is not None:
+            self._checkpoint.flush(timeout=1)
+        if self._session_log is not None:
+            self._session_log.flush()
+
+    def get_scores(self):
+        ''' The high score store '''
+        return self._scores
+
+    def get_cache_stats(self):
+        ''' Return the surface cache hit/miss/eviction counters '''
+        return self._surface_cache.get_stats()
+
     def _line(self, vertical=True):
         ''' Generate a center line '''
         if vertical:
@@ -642,36 +781,9 @@ class Game():
         svg_string += 'style="fill:#000000;stroke:#000000;"/>\n'
         return svg_string
 
-    def _circle(self, r, cx, cy):
-        return '<circle style="fill:' + str(self._fill) + ';stroke:' + \
-            str(self._stroke) + ';" r="' + str(r - 0.5) + '" cx="' + \
-            str(cx) + '" cy="' + str(cy) + '" />\n'
-
     def _footer(self):
         return '</svg>\n'
 
-    def save_highscore(self):
-        file_path = os.path.join(get_activity_root(), 'data', 'highscore')
-        highscore = [0]
-        if os.path.exists(file_path):
-            with open(file_path, "r") as fp:
-                highscore = fp.readlines()
-
-        int_highscore = int(highscore[0])
-        if not int_highscore > self._correct:
-            with open(file_path, "w") as fp:
-                fp.write(str(self._correct))
-
-    def load_highscore(self):
-        file_path = os.path.join(get_activity_root(), 'data', 'highscore')
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, "r") as fp:
-                    highscore = fp.readlines()
-                return int(highscore[0])
-            except ValueError or IndexError:
-                return 0
-        return 0
 
 def svg_str_to_pixbuf(svg_string):
     """ Load pixbuf from SVG string """
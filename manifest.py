@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+The image manifest: a list of the images in the bundle, with a stable id,
+file name, pixel dimensions and content hash for each.
+
+The manifest is regenerated by setup.py whenever the bundle is built.
+Ids are never reused: an image keeps its id across rebuilds, and new
+images are given the next unused id. Saved games and caches refer to
+images by id, so they survive changes to the image set.
+'''
+
+import hashlib
+import os
+import struct
+
+from utils import json_load, json_dump
+
+
+MANIFEST = 'manifest.json'
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def png_size(path):
+    ''' Read the width and height from the IHDR chunk of a PNG file '''
+    with open(path, 'rb') as fp:
+        header = fp.read(24)
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE:
+        return 0, 0
+    return struct.unpack('>II', header[16:24])
+
+
+def file_hash(path):
+    with open(path, 'rb') as fp:
+        return hashlib.sha1(fp.read()).hexdigest()
+
+
+def _read_manifest(image_path):
+    try:
+        with open(os.path.join(image_path, MANIFEST), 'r') as fp:
+            data = json_load(fp.read())
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or 'images' not in data:
+        return None
+    return data
+
+
+def load_manifest(image_path):
+    ''' Return the list of manifest entries (or None if missing) '''
+    data = _read_manifest(image_path)
+    if data is None:
+        return None
+    return data['images']
+
+
+def update_manifest(image_path, end='.png'):
+    ''' Regenerate the manifest, keeping the ids of known images '''
+    data = _read_manifest(image_path) or {'images': []}
+    ids = {}
+    # The high-water mark outlives removed images, so their ids are
+    # never handed out again.
+    next_id = data.get('next_id', 0)
+    for entry in data['images']:
+        ids[entry['file']] = entry['id']
+        next_id = max(next_id, entry['id'] + 1)
+
+    entries = []
+    for name in sorted(os.listdir(image_path)):
+        if not name.endswith(end):
+            continue
+        if name not in ids:
+            ids[name] = next_id
+            next_id += 1
+        path = os.path.join(image_path, name)
+        width, height = png_size(path)
+        entries.append({'id': ids[name],
+                        'file': name,
+                        'width': width,
+                        'height': height,
+                        'sha1': file_hash(path)})
+    entries.sort(key=lambda entry: entry['id'])
+
+    with open(os.path.join(image_path, MANIFEST), 'w') as fp:
+        fp.write(json_dump({'next_id': next_id, 'images': entries}))
+    return entries
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+Decode the image set in the background.
+
+Images are decoded and scaled in a small pool of worker threads. The
+resulting surfaces are handed back to the GLib main loop with idle_add,
+so the surface cache is only ever touched from the main thread.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from gi.repository import GLib
+import os
+
+from surface_cache import image_file_to_surface
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+# XO-class machines have one or two cores; the main loop needs one.
+MAX_WORKERS = 2
+
+
+class Preloader():
+
+    ''' Decode a list of (key, path) pairs into a surface cache '''
+
+    def __init__(self, cache, size, workers=None, store=None):
+        self._cache = cache
+        self._size = size
+        self._store = store
+        if workers is None:
+            workers = min(MAX_WORKERS, os.cpu_count() or 1)
+        self._workers = workers
+        self._executor = None
+        self._futures = []
+        self._pending = set()  # Keys submitted but not yet handed back
+        self._total = 0
+        self._done = 0
+        self._cancelled = False
+        self._progress_cb = None
+
+    def start(self, jobs, progress_cb=None):
+        ''' Start decoding; progress_cb(done, total) runs on the main loop '''
+        self._progress_cb = progress_cb
+        jobs = [(key, path) for key, path in jobs if key not in self._cache]
+        self._pending = set(key for key, path in jobs)
+        self._total = len(jobs)
+        self._done = 0
+        self._cancelled = False
+        if self._total == 0:
+            self._report()
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        self._futures = [self._executor.submit(self._decode, key, path)
+                         for key, path in jobs]
+        # Let the workers finish on their own; do not block the UI.
+        self._executor.shutdown(wait=False)
+
+    def cancel(self):
+        ''' Stop handing surfaces back to the main loop '''
+        self._cancelled = True
+        # Drop the decodes that have not started (shutdown's cancel_futures
+        # needs Python 3.9); the running ones see _cancelled.
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self._pending = set()
+
+    def _decode(self, key, path):
+        ''' Runs in a worker thread '''
+        if self._cancelled:
+            return
+        try:
+            surface = image_file_to_surface(path, self._size, self._size)
+            if self._store is not None:
+                self._store(path, surface)
+        except Exception as e:
+            _logger.error('could not preload %s: %s' % (path, e))
+            surface = None
+        GLib.idle_add(self._finished, key, surface)
+
+    def _finished(self, key, surface):
+        ''' Runs on the main loop '''
+        if self._cancelled:
+            return False
+        self._pending.discard(key)
+        if surface is not None and key not in self._cache:
+            self._cache.put(key, surface)
+        self._done += 1
+        self._report()
+        return False
+
+    def _report(self):
+        if self._progress_cb is not None:
+            self._progress_cb(self._done, self._total)
+
+    def is_pending(self, key):
+        ''' Is the image for key still being decoded? '''
+        return key in self._pending
+
+    def get_progress(self):
+        ''' Return (done, total) '''
+        return self._done, self._total
+
+    def is_ready(self):
+        ''' Have all of the images been decoded? '''
+        return self._done >= self._total
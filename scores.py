@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+High scores, kept in memory and written out in the background.
+
+The store is read once, when the activity starts. It keeps the best
+score for each game mode, the best score reached at each level, and the
+most recent games. Every change is written in the background by an
+AtomicWriter, so a crash never leaves a half-written file. If the file
+is unreadable, it is moved aside and we start again from nothing.
+'''
+
+import os
+import threading
+import time
+
+from atomic_file import AtomicWriter
+from utils import json_load, json_dump
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+SCORES = 'scores.json'
+LEGACY = 'highscore'  # a single number, shared by every game mode
+VERSION = 1
+HISTORY_LENGTH = 50
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _scores(values):
+    ''' Keep the entries of a {key: score} dictionary that are scores '''
+    if not isinstance(values, dict):
+        return {}
+    return dict((key, value) for key, value in values.items()
+                if _is_int(value))
+
+
+class ScoreStore():
+
+    ''' Per-game and per-level high scores, plus recent history '''
+
+    def __init__(self, path, games=4):
+        self._path = path
+        self._lock = threading.Lock()
+        self._writer = AtomicWriter(os.path.join(path, SCORES),
+                                    name='recall-scores')
+        self._data = self._load(games)
+
+    def _empty(self):
+        return {'version': VERSION, 'best': {}, 'levels': {},
+                'history': []}
+
+    def _load(self, games):
+        file_path = os.path.join(self._path, SCORES)
+        if not os.path.exists(file_path):
+            return self._migrate(games)
+        try:
+            with open(file_path, 'r') as fp:
+                data = json_load(fp.read())
+            if not isinstance(data, dict) or \
+               data.get('version') != VERSION:
+                raise ValueError('not a version %d score file' % VERSION)
+            for field in ['best', 'levels']:
+                if not isinstance(data.get(field), dict):
+                    raise ValueError('missing %s' % field)
+            if not isinstance(data.get('history'), list):
+                raise ValueError('missing history')
+        except (IOError, OSError, ValueError, TypeError) as e:
+            _logger.error('could not read %s: %s' % (file_path, e))
+            try:
+                os.rename(file_path, file_path + '.corrupt')
+            except OSError:
+                pass
+            return self._empty()
+        # Drop any entries that are not scores, rather than fail later
+        data['best'] = _scores(data['best'])
+        data['levels'] = dict((game, _scores(levels)) for game, levels
+                              in data['levels'].items())
+        data['history'] = [entry for entry in data['history']
+                           if isinstance(entry, list) and len(entry) == 4
+                           and all(_is_int(value) for value in entry)]
+        return data
+
+    def _migrate(self, games):
+        ''' Carry the old single high score over to every game mode '''
+        data = self._empty()
+        try:
+            with open(os.path.join(self._path, LEGACY), 'r') as fp:
+                score = int(fp.readline())
+        except (IOError, OSError, ValueError):
+            return data
+        for game in range(games):
+            data['best'][str(game)] = score
+        return data
+
+    def get_high_score(self, game):
+        ''' The best score for a game mode '''
+        with self._lock:
+            return self._data['best'].get(str(game), 0)
+
+    def get_level_best(self, game, level):
+        ''' The best score of the games that reached a level '''
+        with self._lock:
+            return self._data['levels'].get(str(game), {}).get(
+                str(level), 0)
+
+    def get_history(self, game=None):
+        ''' Recent games, oldest first, as (time, game, level, score) '''
+        with self._lock:
+            return [tuple(entry) for entry in self._data['history']
+                    if game is None or entry[1] == game]
+
+    def record(self, game, level, score):
+        ''' Add a finished game; return the (new) high score for its mode.
+        Only memory is touched here; the file is written in the
+        background. '''
+        with self._lock:
+            best = self._data['best']
+            best[str(game)] = max(best.get(str(game), 0), score)
+            levels = self._data['levels'].setdefault(str(game), {})
+            levels[str(level)] = max(levels.get(str(level), 0), score)
+            history = self._data['history']
+            history.append([int(time.time()), game, level, score])
+            del history[:-HISTORY_LENGTH]
+            high_score = best[str(game)]
+        self._save()
+        return high_score
+
+    def _save(self):
+        with self._lock:
+            data = json_dump(self._data)
+        self._writer.write(data)
+
+    def flush(self, timeout=None):
+        ''' Wait until every recorded game is on disk '''
+        return self._writer.flush(timeout)
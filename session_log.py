@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+A log of every question asked and every answer given.
+
+Events are held in a fixed-size ring buffer and appended, a batch at a
+time, to one JSON-lines file per month by a single background thread.
+Memory use does not depend on how long the log is, and nothing is read
+at start-up; read_events() streams the files back one event at a time.
+
+Example usage:
+        log = SessionLog(path, session_id)
+        log.record('question', game=0, level=3, shown=[...], options=[...])
+        ...
+        for event in read_events(path):
+            ...
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+from utils import json_load, json_dump
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+CAPACITY = 256  # events held in memory
+BATCH = 32  # events per write
+PREFIX = 'events-'
+SUFFIX = '.jsonl'
+
+
+def _log_name(timestamp):
+    return PREFIX + time.strftime('%Y-%m', time.localtime(timestamp)) + \
+        SUFFIX
+
+
+class SessionLog():
+
+    ''' Record events; append them to disk in batches '''
+
+    def __init__(self, path, session, capacity=CAPACITY, batch=BATCH):
+        self._path = path
+        self._session = session
+        self._events = [None] * capacity
+        self._start = 0  # index of the oldest event
+        self._count = 0
+        self._batch = min(batch, capacity)
+        self._dropped = 0
+        # One worker, so batches are appended in order
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._last = None
+
+    def record(self, kind, **fields):
+        ''' Add an event; cheap enough to call from input handlers '''
+        fields['t'] = round(time.time(), 3)
+        fields['session'] = self._session
+        fields['event'] = kind
+        capacity = len(self._events)
+        if self._count == capacity:  # Overwrite the oldest event
+            self._start = (self._start + 1) % capacity
+            self._count -= 1
+            self._dropped += 1
+        self._events[(self._start + self._count) % capacity] = fields
+        self._count += 1
+        # While a batch is being written, keep buffering (at worst,
+        # dropping the oldest events) rather than queue up more batches
+        if self._count >= self._batch and \
+           (self._last is None or self._last.done()):
+            self.flush(wait=False)
+
+    def flush(self, wait=True):
+        ''' Hand the buffered events to the writer thread '''
+        if self._dropped > 0:
+            _logger.error('session log: dropped %d events' % self._dropped)
+            self._dropped = 0
+        capacity = len(self._events)
+        batch = []
+        for i in range(self._count):
+            j = (self._start + i) % capacity
+            batch.append(self._events[j])
+            self._events[j] = None
+        self._start = 0
+        self._count = 0
+        if len(batch) > 0:
+            self._last = self._executor.submit(self._append, batch)
+        if wait and self._last is not None:
+            self._last.result()
+
+    def _append(self, batch):
+        ''' Runs in the writer thread '''
+        lines = {}
+        for event in batch:
+            name = _log_name(event['t'])
+            lines.setdefault(name, []).append(json_dump(event) + '\n')
+        for name in sorted(lines):
+            file_path = os.path.join(self._path, name)
+            try:
+                with open(file_path, 'a') as fp:
+                    fp.write(''.join(lines[name]))
+            except (IOError, OSError) as e:
+                _logger.error('could not write %s: %s' % (file_path, e))
+
+
+def read_events(path, since=0):
+    ''' Yield the logged events, oldest first, one at a time '''
+    try:
+        names = sorted(name for name in os.listdir(path)
+                       if name.startswith(PREFIX) and name.endswith(SUFFIX))
+    except OSError:
+        return
+    for name in names:
+        if name < _log_name(since):
+            continue
+        with open(os.path.join(path, name), 'r') as fp:
+            for line in fp:
+                try:
+                    event = json_load(line)
+                except ValueError:  # e.g. cut short by a crash
+                    continue
+                if isinstance(event, dict) and event.get('t', 0) >= since:
+                    yield event
@@ -16,7 +16,15 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
+import os
+
 from sugar3.activity import bundlebuilder
 
+from manifest import update_manifest
+
+# Record stable ids for the images before the bundle is assembled
+update_manifest(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'images'))
+
 bundlebuilder.start()
 
@@ -75,7 +75,12 @@ def svg_str_to_pixbuf(svg_string):
     return pixbuf
 
 '''
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
 import cairo
+import sys
 import gi
 from gi.repository import Gdk
 from gi.repository import GdkPixbuf
@@ -83,15 +88,181 @@ from gi.repository import Pango
 gi.require_version('PangoCairo', '1.0')
 from gi.repository import PangoCairo
 
+try:
+    import numpy
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+
+# Size of the cells of the hit-testing grid
+CELL_SIZE = 128
+
+# How many alpha masks to keep before starting afresh
+MAX_MASKS = 256
+
+# How many laid-out labels to keep
+MAX_LAYOUTS = 128
+
+# Beyond this many damage rectangles, a batch invalidates their union
+MAX_DAMAGE_RECTS = 4
+
+# Maps alpha values to ASCII '0' (transparent) or '1' (opaque)
+_ALPHA_TO_BIT = bytes([ord('0')] + [ord('1')] * 255)
+
+
+class AlphaMask:
+
+    ''' A bit-packed record of which pixels of an image are not transparent '''
+
+    def __init__(self, image):
+        self.width = image.get_width()
+        self.height = image.get_height()
+        self._row_bytes = (self.width + 7) // 8
+        # Let Cairo extract the alpha channel, whatever the source is
+        a8 = cairo.ImageSurface(cairo.FORMAT_A8, self.width, self.height)
+        cr = cairo.Context(a8)
+        if hasattr(image, 'atlas'):
+            image.set_source(cr, 0, 0)
+        else:
+            cr.set_source_surface(image, 0, 0)
+        cr.paint()
+        a8.flush()
+        data = bytes(a8.get_data())
+        stride = a8.get_stride()
+        padding = b'0' * (self._row_bytes * 8 - self.width)
+        rows = []
+        for y in range(self.height):
+            bits = data[y * stride:y * stride + self.width].translate(
+                _ALPHA_TO_BIT) + padding
+            rows.append(int(bits, 2).to_bytes(self._row_bytes, 'big'))
+        self._bits = b''.join(rows)
+
+    def opaque(self, x, y):
+        ''' Is pixel (x, y) not fully transparent? '''
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return False
+        byte = self._bits[y * self._row_bytes + (x >> 3)]
+        return bool(byte & (0x80 >> (x & 7)))
+
+
+class _Geometry:
+
+    ''' Sprite rectangles and layers kept in contiguous arrays, so that
+    area and point queries are one vectorized NumPy pass '''
+
+    def __init__(self):
+        self.x = array('i')
+        self.y = array('i')
+        self.width = array('i')
+        self.height = array('i')
+        self.layer = array('i')
+        self.active = array('b')
+        self._sprites = []
+        self._slots = {}
+        self._free = []
+
+    def set(self, spr):
+        ''' Copy the sprite's rect and layer into the arrays '''
+        i = self._slots.get(spr)
+        if i is None:
+            if len(self._free) > 0:
+                i = self._free.pop()
+                self._sprites[i] = spr
+            else:
+                i = len(self._sprites)
+                self._sprites.append(spr)
+                for column in (self.x, self.y, self.width, self.height,
+                               self.layer, self.active):
+                    column.append(0)
+            self._slots[spr] = i
+        self.x[i] = spr.rect.x
+        self.y[i] = spr.rect.y
+        self.width[i] = spr.rect.width
+        self.height[i] = spr.rect.height
+        self.layer[i] = spr.layer
+        self.active[i] = 1
+
+    def clear(self, spr):
+        ''' Exclude a (hidden) sprite from queries '''
+        i = self._slots.get(spr)
+        if i is not None:
+            self.active[i] = 0
+
+    def remove(self, spr):
+        ''' Forget a sprite altogether '''
+        i = self._slots.pop(spr, None)
+        if i is not None:
+            self.active[i] = 0
+            self._sprites[i] = None
+            self._free.append(i)
+
+    def _columns(self):
+        return [numpy.frombuffer(column, dtype=numpy.int32)
+                for column in (self.x, self.y, self.width, self.height)] + \
+            [numpy.frombuffer(self.active, dtype=numpy.int8)]
+
+    def in_area(self, area):
+        ''' Return the active sprites that overlap any of the rectangles '''
+        if len(self._sprites) == 0:
+            return []
+        x, y, width, height, active = self._columns()
+        selected = numpy.zeros(len(self._sprites), dtype=bool)
+        for rect in area:
+            selected |= ((x < rect.x + rect.width) &
+                         (rect.x < x + width) &
+                         (y < rect.y + rect.height) &
+                         (rect.y < y + height))
+        indices = numpy.nonzero(selected & (active != 0))[0]
+        return [self._sprites[i] for i in indices]
+
+    def at(self, pos):
+        ''' Return the active sprites whose rectangles contain pos '''
+        if len(self._sprites) == 0:
+            return []
+        px, py = pos
+        x, y, width, height, active = self._columns()
+        indices = numpy.nonzero((active != 0) &
+                                (x <= px) & (px <= x + width) &
+                                (y <= py) & (py <= y + height))[0]
+        return [self._sprites[i] for i in indices]
+
 
 class Sprites:
 
     ''' A class for the list of sprites and everything they share in common '''
 
-    def __init__(self, widget):
+    def __init__(self, widget, cell_size=CELL_SIZE):
         ''' Initialize an empty array of sprites '''
         self.widget = widget
+        # Sprites sorted by (layer, sequence): the sequence number breaks
+        # ties so that the most recently layered sprite is on top.
         self.list = []
+        self._keys = []
+        self._members = set()
+        self._sequence = 0
+        # One spatial index for hit testing and partial redraws: with
+        # NumPy, a struct-of-arrays copy of the geometry for vectorized
+        # queries; without it, a uniform grid of cells, each holding the
+        # sprites that overlap it.
+        self._cell_size = cell_size
+        self._grid = {}
+        self._cells = {}
+        self._geometry = _Geometry() if HAVE_NUMPY else None
+        # Alpha masks are shared by all sprites showing the same image
+        self._masks = {}
+        # Laid-out labels, keyed by text, font, scale, width and mode
+        self._layouts = OrderedDict()
+        # Retained mode: layers below _retained_below are composited once
+        # into an offscreen back buffer and only redrawn when they change
+        self._retained_below = None
+        self._background = None
+        self._back_buffer = None
+        self._back_dirty = True
+        # Batched mutations: damage and re-layering wait for the batch end
+        self._batch_depth = 0
+        self._damage = []
+        self._pending_layers = OrderedDict()
         self.cr = None
         self.defer_draw = False
 
@@ -114,37 +285,210 @@ class Sprites:
         return len(self.list)
 
     def append_to_list(self, spr):
-        ''' Append a new sprite to the end of the list. '''
-        self.list.append(spr)
+        ''' Add a sprite on top of the other sprites in its layer. '''
+        self._unlist(spr)  # Re-layering keeps the sprite in the index
+        self._sequence += 1
+        spr._key = (spr.layer, self._sequence)
+        i = bisect_right(self._keys, spr._key)
+        self._keys.insert(i, spr._key)
+        self.list.insert(i, spr)
+        self._members.add(spr)
 
     def insert_in_list(self, spr, i):
-        ''' Insert a sprite at position i. '''
-        if i < 0:
-            self.list.insert(0, spr)
-        elif i > len(self.list) - 1:
-            self.list.append(spr)
-        else:
-            self.list.insert(i, spr)
+        ''' Insert a sprite. The position is determined by its layer. '''
+        self.append_to_list(spr)
 
     def find_in_list(self, spr):
-        return spr in self.list
+        ''' Is the sprite in the list and visible? '''
+        return spr in self._members and spr.visible
+
+    def _unlist(self, spr):
+        if spr in self._members:
+            i = bisect_left(self._keys, spr._key)
+            del self._keys[i]
+            del self.list[i]
+            self._members.discard(spr)
 
     def remove_from_list(self, spr):
         ''' Remove a sprite from the list. '''
-        if spr in self.list:
-            self.list.remove(spr)
+        self._unlist(spr)
+        self._pending_layers.pop(spr, None)
+        self.remove_from_index(spr)
+        if self._geometry is not None:
+            self._geometry.remove(spr)
+
+    @contextmanager
+    def batch(self):
+        ''' Suspend invalidation and re-layering; on exit, apply the layer
+        changes once and invalidate a coalesced set of rectangles '''
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._end_batch()
+
+    def in_batch(self):
+        return self._batch_depth > 0
+
+    def defer_layer(self, spr):
+        ''' Re-layer a sprite when the current batch ends '''
+        self._pending_layers.pop(spr, None)  # The last call wins
+        self._pending_layers[spr] = True
+
+    def add_damage(self, x, y, width, height):
+        ''' Remember a rectangle to invalidate when the batch ends '''
+        if width > 0 and height > 0:
+            self._damage.append((x, y, x + width, y + height))
+
+    def _end_batch(self):
+        pending = list(self._pending_layers)
+        self._pending_layers.clear()
+        for spr in pending:  # Hidden or not, spr.layer has changed
+            self.append_to_list(spr)
+        for x1, y1, x2, y2 in _coalesce(self._damage):
+            self.widget.queue_draw_area(x1, y1, x2 - x1, y2 - y1)
+        self._damage = []
+
+    def set_retained(self, state, below=100, background=None):
+        ''' Cache the layers below 'below' (and an optional background
+        color) in an offscreen surface '''
+        if state:
+            self._retained_below = below
+            self._background = background
+        else:
+            self._retained_below = None
+            self._back_buffer = None
+        self._back_dirty = True
+
+    def is_retained(self, spr):
+        ''' Is the sprite drawn into the back buffer? '''
+        return self._retained_below is not None and \
+            spr.layer < self._retained_below
+
+    def mark_dirty(self):
+        ''' Something in the retained layers has changed '''
+        self._back_dirty = True
+
+    def _update_back_buffer(self, cr):
+        width = self.widget.get_allocated_width()
+        height = self.widget.get_allocated_height()
+        if self._back_buffer is None or \
+           self._back_buffer.get_width() != width or \
+           self._back_buffer.get_height() != height:
+            self._back_buffer = cr.get_target().create_similar(
+                cairo.CONTENT_COLOR_ALPHA, width, height)
+            self._back_dirty = True
+        if not self._back_dirty:
+            return
+        back_cr = cairo.Context(self._back_buffer)
+        back_cr.set_operator(cairo.OPERATOR_SOURCE)
+        if self._background is not None:
+            back_cr.set_source_rgb(*self._background)
+        else:
+            back_cr.set_source_rgba(0, 0, 0, 0)
+        back_cr.paint()
+        back_cr.set_operator(cairo.OPERATOR_OVER)
+        for spr in self.list:
+            if spr.layer >= self._retained_below:
+                break
+            if spr.visible:
+                spr.draw(cr=back_cr)
+        self._back_dirty = False
+
+    def get_alpha_mask(self, image):
+        ''' Return the (lazily built) alpha mask for an image '''
+        mask = self._masks.get(image)
+        if mask is None:
+            if len(self._masks) > MAX_MASKS:
+                self._masks.clear()
+            mask = AlphaMask(image)
+            self._masks[image] = mask
+        return mask
+
+    def get_label_layout(self, key):
+        ''' Return a cached (layout, width, height), or None '''
+        cached = self._layouts.get(key)
+        if cached is not None:
+            self._layouts.move_to_end(key)
+        return cached
+
+    def set_label_layout(self, key, layout):
+        ''' Cache a (layout, width, height) '''
+        self._layouts[key] = layout
+        if len(self._layouts) > MAX_LAYOUTS:
+            self._layouts.popitem(last=False)
+
+    def _cells_for_rect(self, rect):
+        size = self._cell_size
+        cells = []
+        x, y = int(rect.x), int(rect.y)
+        for cx in range(x // size, int(x + rect.width) // size + 1):
+            for cy in range(y // size, int(y + rect.height) // size + 1):
+                cells.append((cx, cy))
+        return cells
+
+    def update_index(self, spr):
+        ''' Record where a (visible) sprite is '''
+        self.remove_from_index(spr)
+        if not spr.visible:
+            return
+        if self._geometry is not None:
+            self._geometry.set(spr)
+            return
+        cells = self._cells_for_rect(spr.rect)
+        for cell in cells:
+            if cell in self._grid:
+                self._grid[cell].add(spr)
+            else:
+                self._grid[cell] = set([spr])
+        self._cells[spr] = cells
+
+    def remove_from_index(self, spr):
+        ''' Exclude a sprite from hit testing and partial redraws '''
+        if self._geometry is not None:
+            self._geometry.clear(spr)
+            return
+        for cell in self._cells.pop(spr, []):
+            self._grid[cell].discard(spr)
+            if len(self._grid[cell]) == 0:
+                del self._grid[cell]
+
+    def _in_area(self, area):
+        ''' Return the visible sprites that overlap any of the rectangles '''
+        if self._geometry is not None:
+            return self._geometry.in_area(area)
+        found = set()
+        for rect in area:
+            for cell in self._cells_for_rect(rect):
+                for spr in self._grid.get(cell, []):
+                    if spr not in found and \
+                       spr.rect.x < rect.x + rect.width and \
+                       rect.x < spr.rect.x + spr.rect.width and \
+                       spr.rect.y < rect.y + rect.height and \
+                       rect.y < spr.rect.y + spr.rect.height:
+                        found.add(spr)
+        return list(found)
 
     def find_sprite(self, pos, region=False):
         ''' Search based on (x, y) position. Return the 'top/first' one. '''
-        list_pos = self.list[:]
-        list_pos.reverse()
-        for spr in list_pos:
+        if self._geometry is not None:
+            candidates = self._geometry.at(pos)
+        else:
+            cell = (int(pos[0]) // self._cell_size,
+                    int(pos[1]) // self._cell_size)
+            candidates = self._grid.get(cell, [])
+        candidates = [spr for spr in candidates if spr in self._members]
+        candidates.sort(key=lambda spr: spr._key, reverse=True)
+        for spr in candidates:
             if spr.hit(pos, readpixel=not region):
                 return spr
         return None
 
     def redraw_sprites(self, area=None, cr=None):
-        ''' Redraw the sprites that intersect area. '''
+        ''' Redraw the sprites that intersect area (a rectangle or a list
+        of rectangles). Return the number of sprites drawn. '''
         # I think I need to do this to save Cairo some work
         self.defer_draw = False
         if cr is None:
@@ -153,20 +497,100 @@ class Sprites:
             self.cr = cr
         if cr is None:
             print('sprites.redraw_sprites: no Cairo context')
-            return
-        for spr in self.list:
+            return 0
+        if area is not None and not isinstance(area, (list, tuple)):
+            area = [area]
+        count = 0
+        if self._retained_below is not None:
+            self._update_back_buffer(cr)
+            cr.set_source_surface(self._back_buffer, 0, 0)
             if area is None:
-                spr.draw(cr=cr)
+                cr.paint()
+            else:
+                for rect in area:
+                    cr.rectangle(rect.x, rect.y, rect.width, rect.height)
+                cr.fill()
+        if area is None:
+            candidates = self.list
+        else:
+            candidates = [spr for spr in self._in_area(area)
+                          if spr in self._members]
+            candidates.sort(key=lambda spr: spr._key)
+        for spr in candidates:
+            if not spr.visible or self.is_retained(spr):
+                continue
+            spr.draw(cr=cr)
+            count += 1
+        return count
+
+
+def _coalesce(rects):
+    ''' Merge overlapping (x1, y1, x2, y2) rectangles. If too many remain,
+    return their union. '''
+    merged = []
+    for rect in rects:
+        x1, y1, x2, y2 = rect
+        i = 0
+        while i < len(merged):
+            a1, b1, a2, b2 = merged[i]
+            if x1 <= a2 and a1 <= x2 and y1 <= b2 and b1 <= y2:
+                # Grow the new rectangle and check the others again
+                x1, y1 = min(x1, a1), min(y1, b1)
+                x2, y2 = max(x2, a2), max(y2, b2)
+                del merged[i]
+                i = 0
             else:
-                intersection = spr.rect.intersect(area)
-                if intersection.width > 0 or intersection.height > 0:
-                    spr.draw(cr=cr)
+                i += 1
+        merged.append((x1, y1, x2, y2))
+    if len(merged) > MAX_DAMAGE_RECTS:
+        merged = [(min([r[0] for r in merged]), min([r[1] for r in merged]),
+                   max([r[2] for r in merged]), max([r[3] for r in merged]))]
+    return merged
+
+
+class _Label:
+
+    ''' The text and attributes of one sprite label '''
+
+    __slots__ = ('text', 'scale', 'rescale', 'horiz_align', 'vert_align',
+                 'x_pos', 'y_pos')
+
+    def __init__(self, text=' ', scale=12, rescale=True, horiz_align='center',
+                 vert_align='middle', x_pos=None, y_pos=None):
+        self.text = text
+        self.scale = scale
+        self.rescale = rescale
+        self.horiz_align = horiz_align
+        self.vert_align = vert_align
+        self.x_pos = x_pos
+        self.y_pos = y_pos
+
+    def copy(self, text=' '):
+        ''' A new label with the same attributes '''
+        return _Label(text, self.scale, self.rescale, self.horiz_align,
+                      self.vert_align, self.x_pos, self.y_pos)
+
+
+class _Image:
+
+    ''' One image layer of a sprite: a surface and its offset '''
+
+    __slots__ = ('surface', 'dx', 'dy')
+
+    def __init__(self, surface=None, dx=0, dy=0):
+        self.surface = surface
+        self.dx = dx
+        self.dy = dy
 
 
 class Sprite:
 
     ''' A class for the individual sprites '''
 
+    __slots__ = ('_sprites', 'save_xy', 'rect', '_labels', '_images',
+                 '_fd', '_font', '_bold', '_italic', '_color', '_margins',
+                 'layer', 'visible', '_key', 'type')
+
     def __init__(self, sprites, x, y, image):
         ''' Initialize an individual sprite '''
         self._sprites = sprites
@@ -176,36 +600,30 @@ class Sprite:
         self.rect.y = int(y)
         self.rect.width = image.get_height()
         self.rect.height = image.get_width()
-        self._scale = [12]
-        self._rescale = [True]
-        self._horiz_align = ['center']
-        self._vert_align = ['middle']
-        self._x_pos = [None]
-        self._y_pos = [None]
+        self._labels = []
+        self._images = []
         self._fd = None
+        self._font = None
         self._bold = False
         self._italic = False
         self._color = None
         self._margins = [0, 0, 0, 0]
         self.layer = 100
-        self.labels = []
-        self.cached_surfaces = []
-        self._dx = []  # image offsets
-        self._dy = []
+        self.visible = True
+        self._key = None
         self.type = None
         self.set_image(image)
         self._sprites.append_to_list(self)
 
     def set_image(self, image, i=0, dx=0, dy=0):
         ''' Add an image to the sprite. '''
-        while len(self.cached_surfaces) < i + 1:
-            self.cached_surfaces.append(None)
-            self._dx.append(0)
-            self._dy.append(0)
-        self._dx[i] = dx
-        self._dy[i] = dy
+        while len(self._images) < i + 1:
+            self._images.append(_Image())
+        self._images[i].dx = dx
+        self._images[i].dy = dy
         if isinstance(image, GdkPixbuf.Pixbuf) or \
-           isinstance(image, cairo.ImageSurface):
+           isinstance(image, cairo.ImageSurface) or \
+           hasattr(image, 'atlas'):
             w = image.get_width()
             h = image.get_height()
         else:
@@ -218,8 +636,10 @@ class Sprite:
                 self.rect.width = w + dx
             if h + dy > self.rect.height:
                 self.rect.height = h + dy
-        if isinstance(image, cairo.ImageSurface):
-            self.cached_surfaces[i] = image
+        self._sprites.update_index(self)
+        if isinstance(image, cairo.ImageSurface) or \
+           hasattr(image, 'atlas'):  # a surface or a region of an atlas
+            self._images[i].surface = image
         else:  # Convert to Cairo surface
             surface = cairo.ImageSurface(
                 cairo.FORMAT_ARGB32, self.rect.width, self.rect.height)
@@ -227,12 +647,23 @@ class Sprite:
             Gdk.cairo_set_source_pixbuf(context, image, 0, 0)
             context.rectangle(0, 0, self.rect.width, self.rect.height)
             context.fill()
-            self.cached_surfaces[i] = surface
+            self._images[i].surface = surface
+
+    @property
+    def labels(self):
+        ''' The label strings '''
+        return [label.text for label in self._labels]
+
+    @property
+    def cached_surfaces(self):
+        ''' The image surfaces, one per image layer '''
+        return [image.surface for image in self._images]
 
     def move(self, pos):
         ''' Move to new (x, y) position '''
         self.inval()
         self.rect.x, self.rect.y = int(pos[0]), int(pos[1])
+        self._sprites.update_index(self)
         self.inval()
 
     def move_relative(self, pos):
@@ -240,6 +671,7 @@ class Sprite:
         self.inval()
         self.rect.x += int(pos[0])
         self.rect.y += int(pos[1])
+        self._sprites.update_index(self)
         self.inval()
 
     def get_xy(self):
@@ -261,17 +693,17 @@ class Sprite:
         self.inval()
 
     def set_layer(self, layer=None):
-        ''' Set the layer for a sprite '''
-        self._sprites.remove_from_list(self)
+        ''' Set the layer for a sprite (and show it) '''
+        if self._sprites.is_retained(self):  # It may be leaving the cache
+            self._sprites.mark_dirty()
         if layer is not None:
             self.layer = layer
-        for i in range(self._sprites.length_of_list()):
-            spr = self._sprites.get_sprite(i)
-            if spr is not None and self.layer < spr.layer:
-                self._sprites.insert_in_list(self, i)
-                self.inval()
-                return
-        self._sprites.append_to_list(self)
+        self.visible = True
+        if self._sprites.in_batch():
+            self._sprites.defer_layer(self)
+        else:
+            self._sprites.append_to_list(self)
+        self._sprites.update_index(self)
         self.inval()
 
     def set_label(self, new_label, i=0):
@@ -279,9 +711,9 @@ class Sprite:
         self._extend_labels_array(i)
         if isinstance(new_label, str):
             # pango doesn't like nulls
-            self.labels[i] = new_label.replace('\0', ' ')
+            self._labels[i].text = new_label.replace('\0', ' ')
         else:
-            self.labels[i] = str(new_label)
+            self._labels[i].text = str(new_label)
         self.inval()
 
     def set_margins(self, left=0, top=0, right=0, bottom=0):
@@ -294,17 +726,15 @@ class Sprite:
             self.set_font('Sans')
         if self._color is None:
             self._color = (0., 0., 0.)
-        while len(self.labels) < i + 1:
-            self.labels.append(' ')
-            self._scale.append(self._scale[0])
-            self._rescale.append(self._rescale[0])
-            self._horiz_align.append(self._horiz_align[0])
-            self._vert_align.append(self._vert_align[0])
-            self._x_pos.append(self._x_pos[0])
-            self._y_pos.append(self._y_pos[0])
+        while len(self._labels) < i + 1:
+            if len(self._labels) == 0:
+                self._labels.append(_Label())
+            else:  # New labels take their attributes from the first one
+                self._labels.append(self._labels[0].copy())
 
     def set_font(self, font):
         ''' Set the font for a label '''
+        self._font = font
         self._fd = Pango.FontDescription(font)
 
     def set_label_color(self, rgb):
@@ -326,24 +756,36 @@ class Sprite:
                              vert_align='middle', x_pos=None, y_pos=None, i=0):
         ''' Set the various label attributes '''
         self._extend_labels_array(i)
-        self._scale[i] = scale
-        self._rescale[i] = rescale
-        self._horiz_align[i] = horiz_align
-        self._vert_align[i] = vert_align
-        self._x_pos[i] = x_pos
-        self._y_pos[i] = y_pos
+        label = self._labels[i]
+        label.scale = scale
+        label.rescale = rescale
+        label.horiz_align = horiz_align
+        label.vert_align = vert_align
+        label.x_pos = x_pos
+        label.y_pos = y_pos
 
     def hide(self):
-        ''' Hide a sprite '''
-        self.inval()
-        self._sprites.remove_from_list(self)
+        ''' Hide a sprite (it keeps its place in the list) '''
+        if self.visible:
+            self.inval()
+            self.visible = False
+            self._sprites.remove_from_index(self)
 
     def restore(self):
         ''' Restore a hidden sprite '''
-        self.set_layer()
+        if not self.visible:
+            self.visible = True
+            self._sprites.update_index(self)
+            self.inval()
 
     def inval(self):
         ''' Invalidate a region for gtk '''
+        if self._sprites.is_retained(self):
+            self._sprites.mark_dirty()
+        if self._sprites.in_batch():
+            self._sprites.add_damage(self.rect.x, self.rect.y,
+                                     self.rect.width, self.rect.height)
+            return
         self._sprites.widget.queue_draw_area(self.rect.x,
                                              self.rect.y,
                                              self.rect.width,
@@ -356,17 +798,25 @@ class Sprite:
         if cr is None:
             print('sprite.draw: no Cairo context.')
             return
-        for i, surface in enumerate(self.cached_surfaces):
-            cr.set_source_surface(surface,
-                                  self.rect.x + self._dx[i],
-                                  self.rect.y + self._dy[i])
-            cr.rectangle(self.rect.x + self._dx[i],
-                         self.rect.y + self._dy[i],
-                         self.rect.width,
-                         self.rect.height)
+        for image in self._images:
+            surface = image.surface
+            width, height = self.rect.width, self.rect.height
+            if hasattr(surface, 'atlas'):
+                # Don't bleed into the neighbouring atlas regions
+                width = min(width, surface.width)
+                height = min(height, surface.height)
+                surface.set_source(cr, self.rect.x + image.dx,
+                                   self.rect.y + image.dy)
+            else:
+                cr.set_source_surface(surface,
+                                      self.rect.x + image.dx,
+                                      self.rect.y + image.dy)
+            cr.rectangle(self.rect.x + image.dx,
+                         self.rect.y + image.dy,
+                         width, height)
             cr.fill()
 
-        if len(self.labels) > 0:
+        if len(self._labels) > 0:
             self.draw_label(cr)
 
     def hit(self, pos, readpixel=False):
@@ -380,14 +830,21 @@ class Sprite:
             return False
         if y > self.rect.y + self.rect.height:
             return False
-        if readpixel:
-            r, g, b, a = self.get_pixel(pos)
-            if r == g == b == a == 0:
-                return False
-            if a == -1:
-                return False
+        if readpixel and not self._opaque_at(x, y):
+            return False
         return self._sprites.find_in_list(self)
 
+    def _opaque_at(self, x, y):
+        ''' Is any image layer not transparent at (x, y)? '''
+        for image in self._images:
+            if image.surface is None:
+                continue
+            mask = self._sprites.get_alpha_mask(image.surface)
+            if mask.opaque(int(x - self.rect.x - image.dx),
+                           int(y - self.rect.y - image.dy)):
+                return True
+        return False
+
     def draw_label(self, cr):
         ''' Draw the label based on its attributes '''
 
@@ -395,37 +852,21 @@ class Sprite:
         if my_width < 0:
             my_width = 0
         my_height = self.rect.height - self._margins[1] - self._margins[3]
-        for i in range(len(self.labels)):
-            pl = PangoCairo.create_layout(cr)
-            pl.set_text(self.labels[i], -1)
-            self._fd.set_size(int(self._scale[i] * Pango.SCALE))
-            pl.set_font_description(self._fd)
-            w = pl.get_size()[0] / Pango.SCALE
-            if w > my_width:
-                if self._rescale[i]:
-                    self._fd.set_size(
-                        int(self._scale[i] * Pango.SCALE * my_width / w))
-                    pl.set_font_description(self._fd)
-                    w = pl.get_size()[0] / Pango.SCALE
-                else:
-                    pl.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
-                    self._fd.set_size(int(self._scale[i] * Pango.SCALE))
-                    pl.set_font_description(self._fd)
-                    w = pl.get_size()[0] / Pango.SCALE
-            if self._x_pos[i] is not None:
-                x = int(self.rect.x + self._x_pos[i])
-            elif self._horiz_align[i] == 'center':
+        for label in self._labels:
+            pl, w, h = self._get_layout(cr, label, my_width)
+            if label.x_pos is not None:
+                x = int(self.rect.x + label.x_pos)
+            elif label.horiz_align == 'center':
                 x = int(self.rect.x + self._margins[0] + (my_width - w) / 2)
-            elif self._horiz_align[i] == 'left':
+            elif label.horiz_align == 'left':
                 x = int(self.rect.x + self._margins[0])
             else:  # right
                 x = int(self.rect.x + self.rect.width - w - self._margins[2])
-            h = pl.get_size()[1] / Pango.SCALE
-            if self._y_pos[i] is not None:
-                y = int(self.rect.y + self._y_pos[i])
-            elif self._vert_align[i] == 'middle':
+            if label.y_pos is not None:
+                y = int(self.rect.y + label.y_pos)
+            elif label.vert_align == 'middle':
                 y = int(self.rect.y + self._margins[1] + (my_height - h) / 2)
-            elif self._vert_align[i] == 'top':
+            elif label.vert_align == 'top':
                 y = int(self.rect.y + self._margins[1])
             else:  # bottom
                 y = int(self.rect.y + self.rect.height - h - self._margins[3])
@@ -438,17 +879,39 @@ class Sprite:
 
             cr.restore()
 
+    def _get_layout(self, cr, label, my_width=None):
+        ''' Return a (cached) Pango layout for a label, with its size '''
+        key = (label.text, self._font, label.scale, my_width, label.rescale)
+        cached = self._sprites.get_label_layout(key)
+        if cached is not None:
+            return cached
+        pl = PangoCairo.create_layout(cr)
+        pl.set_text(label.text, -1)
+        self._fd.set_size(int(label.scale * Pango.SCALE))
+        pl.set_font_description(self._fd)
+        w = pl.get_size()[0] / Pango.SCALE
+        if my_width is not None and w > my_width:
+            if label.rescale:
+                self._fd.set_size(
+                    int(label.scale * Pango.SCALE * my_width / w))
+                pl.set_font_description(self._fd)
+                w = pl.get_size()[0] / Pango.SCALE
+            else:
+                pl.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
+                self._fd.set_size(int(label.scale * Pango.SCALE))
+                pl.set_font_description(self._fd)
+                w = pl.get_size()[0] / Pango.SCALE
+        h = pl.get_size()[1] / Pango.SCALE
+        self._sprites.set_label_layout(key, (pl, w, h))
+        return pl, w, h
+
     def label_width(self):
         ''' Calculate the width of a label '''
         cr = self._sprites.cr
         if cr is not None:
             maximum = 0
-            for i in range(len(self.labels)):
-                pl = PangoCairo.create_layout(cr)
-                pl.set_text(self.labels[i], -1)
-                self._fd.set_size(int(self._scale[i] * Pango.SCALE))
-                pl.set_font_description(self._fd)
-                w = pl.get_size()[0] / Pango.SCALE
+            for label in self._labels:
+                w = self._get_layout(cr, label)[1]
                 if w > maximum:
                     maximum = w
             return maximum
@@ -475,12 +938,18 @@ class Sprite:
                 y < 0 or y > (self.rect.height - 1):
             return -1, -1, -1, -1
         # Create a new 1x1 cairo surface.
-        cs = cairo.ImageSurface(cairo.FORMAT_RGB24, 1, 1)
+        cs = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
         cr = cairo.Context(cs)
-        cr.set_source_surface(self.cached_surfaces[i], -x, -y)
+        surface = self._images[i].surface
+        if hasattr(surface, 'atlas'):
+            surface.set_source(cr, -x, -y)
+        else:
+            cr.set_source_surface(surface, -x, -y)
         cr.rectangle(0, 0, 1, 1)
         cr.set_operator(cairo.OPERATOR_SOURCE)
         cr.fill()
         cs.flush()  # Ensure all the writing is done.
         pixels = cs.get_data()  # Read the pixel.
-        return pixels[2], pixels[1], pixels[0], 0
+        if sys.byteorder == 'little':
+            return pixels[2], pixels[1], pixels[0], pixels[3]
+        return pixels[1], pixels[2], pixels[3], pixels[0]
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+A bounded cache for the Cairo surfaces used by the game.
+
+Entries are keyed by (kind, id, size), where kind is one of 'color',
+'image' or 'color-image'. The least-recently-used entries are evicted
+once the total size of the cached pixel buffers exceeds the byte budget.
+'''
+
+from collections import OrderedDict
+import math
+from gi.repository import GdkPixbuf
+from gi.repository import Gdk
+import cairo
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+# Enough for the 53 images at a typical XO dot size, plus the colors
+MAX_BYTES = 32 * 1024 * 1024
+
+
+def surface_bytes(surface):
+    ''' How much memory does an image surface use? '''
+    return surface.get_stride() * surface.get_height()
+
+
+def image_file_to_surface(path, width, height):
+    ''' Decode and scale an image file into a new ARGB32 surface '''
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(path, width, height)
+    return pixbuf_to_surface(pixbuf, width, height)
+
+
+def pixbuf_to_surface(pixbuf, width, height):
+    ''' Copy a pixbuf into a new ARGB32 surface '''
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    context = cairo.Context(surface)
+    Gdk.cairo_set_source_pixbuf(context, pixbuf, 0, 0)
+    context.rectangle(0, 0, width, height)
+    context.fill()
+    return surface
+
+
+def hex_to_rgb(color):
+    ''' Convert '#RRGGBB' to a tuple of floats '''
+    return (int(color[1:3], 16) / 255.,
+            int(color[3:5], 16) / 255.,
+            int(color[5:7], 16) / 255.)
+
+
+def dot_surface(color, size):
+    ''' Draw a filled circle straight onto a new ARGB32 surface '''
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+    context = cairo.Context(surface)
+    context.set_source_rgb(*hex_to_rgb(color))
+    # Same geometry as the old SVG: r - 0.5, stroked with a 1px line
+    context.arc(size / 2., size / 2., size / 2. - 0.5, 0, 2 * math.pi)
+    context.fill_preserve()
+    context.set_line_width(1)
+    context.stroke()
+    return surface
+
+
+class SurfaceCache():
+
+    ''' LRU cache of Cairo image surfaces with a byte budget '''
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        ''' Return the cached surface (or None) and mark it as recent '''
+        surface = self._entries.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return surface
+
+    def put(self, key, surface):
+        ''' Add a surface to the cache, evicting old entries as needed '''
+        if key in self._entries:
+            self._bytes -= surface_bytes(self._entries.pop(key))
+        self._entries[key] = surface
+        self._bytes += surface_bytes(surface)
+        self._evict()
+
+    def set_max_bytes(self, max_bytes):
+        ''' Change the byte budget, evicting entries if necessary '''
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        ''' Drop the oldest entries until we are within budget '''
+        # Always keep the newest entry, even if it alone is over budget
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old_surface = self._entries.popitem(last=False)
+            self._bytes -= surface_bytes(old_surface)
+            self.evictions += 1
+            _logger.debug('surface cache evicted %s' % (str(old_key)))
+
+    def discard(self, key):
+        ''' Remove an entry, if present '''
+        if key in self._entries:
+            self._bytes -= surface_bytes(self._entries.pop(key))
+
+    def clear(self):
+        ''' Remove all entries (but keep the counters) '''
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_size(self):
+        ''' Return the number of bytes currently cached '''
+        return self._bytes
+
+    def get_stats(self):
+        ''' Return a dictionary of the cache counters '''
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes}
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+Let the tests import the activity modules without a display.
+
+Where GTK (gi), pycairo or the Sugar toolkit are not installed, minimal
+stand-ins are registered: just enough for the modules to import and for
+Sprites to keep its bookkeeping. Nothing here draws.
+'''
+
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+class Rectangle():
+
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+class _Anything():
+
+    ''' An attribute bag: any attribute is another _Anything '''
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return _Anything()
+
+    def __call__(self, *args, **kwargs):
+        return _Anything()
+
+
+class _Screen():
+
+    @staticmethod
+    def width():
+        return 1200
+
+    @staticmethod
+    def height():
+        return 900
+
+
+class _Surface():
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def _install_gi():
+    try:
+        import gi  # noqa: F401
+        from gi.repository import Gdk  # noqa: F401
+        return
+    except (ImportError, ValueError):
+        pass
+    repository = _module('gi.repository')
+    _module('gi', repository=repository, require_version=lambda *args: None)
+    for name in ['Gtk', 'GLib', 'GdkPixbuf', 'Pango', 'PangoCairo']:
+        setattr(repository, name, _Anything())
+        sys.modules['gi.repository.' + name] = getattr(repository, name)
+    repository.Gdk = _module('gi.repository.Gdk', Rectangle=Rectangle,
+                             Screen=_Screen, EventMask=_Anything(),
+                             cairo_set_source_pixbuf=_Anything())
+    repository.GdkPixbuf.Pixbuf = type('Pixbuf', (), {})
+
+
+def _install_cairo():
+    try:
+        import cairo  # noqa: F401
+        return
+    except ImportError:
+        pass
+    _module('cairo', ImageSurface=_Surface, Context=_Anything,
+            Error=Exception, Rectangle=Rectangle, FORMAT_ARGB32=0,
+            FORMAT_A8=2, CONTENT_COLOR_ALPHA=0, OPERATOR_SOURCE=1,
+            OPERATOR_OVER=2)
+
+
+def _install_sugar():
+    try:
+        import sugar3  # noqa: F401
+        return
+    except ImportError:
+        pass
+    _module('sugar3')
+    _module('sugar3.bundle')
+    _module('sugar3.bundle.activitybundle', ActivityBundle=_Anything)
+    _module('sugar3.graphics')
+    _module('sugar3.graphics.style', GRID_CELL_SIZE=75)
+    _module('sugar3.activity')
+    _module('sugar3.activity.activity',
+            get_activity_root=lambda: os.environ.get('TMPDIR', '/tmp'))
+
+
+_install_gi()
+_install_cairo()
+_install_sugar()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import logging
+import os
+import threading
+
+from atomic_file import AtomicWriter
+
+
+def test_write_then_flush(tmp_path):
+    file_path = tmp_path / 'state.json'
+    writer = AtomicWriter(str(file_path))
+    writer.write('one')
+    assert writer.flush(timeout=5)
+    assert file_path.read_text() == 'one'
+    writer.write('two')
+    assert writer.flush(timeout=5)
+    assert file_path.read_text() == 'two'
+    assert os.listdir(str(tmp_path)) == ['state.json']
+
+
+def test_writes_are_coalesced(tmp_path):
+    file_path = tmp_path / 'state.json'
+    writer = AtomicWriter(str(file_path))
+    written = []
+    started = threading.Event()
+    release = threading.Event()
+    write = writer._write
+
+    def slow_write(data):
+        written.append(data)
+        started.set()
+        release.wait(5)
+        write(data)
+
+    writer._write = slow_write
+    writer.write('first')
+    assert started.wait(5)
+    for data in ['second', 'third', 'last']:  # While 'first' is written
+        writer.write(data)
+    assert not writer.flush(timeout=0.01)
+    release.set()
+    assert writer.flush(timeout=5)
+    assert written == ['first', 'last']
+    assert file_path.read_text() == 'last'
+
+
+def test_a_failed_write_leaves_the_old_file(tmp_path, caplog):
+    file_path = tmp_path / 'state.json'
+    file_path.write_text(u'old')
+    writer = AtomicWriter(str(file_path))
+    os.mkdir(str(file_path) + '.tmp')  # The temporary file cannot be made
+    with caplog.at_level(logging.ERROR, logger='recall-activity'):
+        writer.write('new')
+        assert writer.flush(timeout=5)
+    assert file_path.read_text() == 'old'
+    assert len(caplog.records) == 1
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import time
+
+import pytest
+
+import checkpoint
+from checkpoint import Checkpoint
+
+SNAPSHOT = {'version': 1, 'game': 0, 'level': 3, 'correct': 2,
+            'round': None}
+
+
+def test_save_and_load(tmp_path):
+    saved = Checkpoint(str(tmp_path), 'activity-1')
+    assert saved.load() is None
+    before = time.time()
+    saved.save(dict(SNAPSHOT, correct=1))
+    saved.save(SNAPSHOT)  # The latest snapshot wins
+    assert saved.flush(timeout=5)
+
+    saved_time, snapshot = Checkpoint(str(tmp_path), 'activity-1').load()
+    assert snapshot == SNAPSHOT
+    # Kept to the sub-second, unlike the Journal timestamp
+    assert isinstance(saved_time, float)
+    assert before <= saved_time <= time.time()
+
+
+def test_another_activity_is_ignored(tmp_path):
+    saved = Checkpoint(str(tmp_path), 'activity-1')
+    saved.save(SNAPSHOT)
+    assert saved.flush(timeout=5)
+    assert Checkpoint(str(tmp_path), 'activity-2').load() is None
+
+
+@pytest.mark.parametrize('contents', [
+    u'{"activity": "activity-1", "time": ',
+    u'[]',
+    u'{"activity": "activity-1", "snapshot": {}}',
+    u'{"activity": "activity-1", "time": "x", "snapshot": {}}'])
+def test_an_unreadable_checkpoint_is_ignored(tmp_path, contents):
+    (tmp_path / checkpoint.CHECKPOINT).write_text(contents)
+    assert Checkpoint(str(tmp_path), 'activity-1').load() is None
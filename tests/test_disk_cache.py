@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import logging
+import os
+import threading
+
+from disk_cache import DiskCache
+
+
+class Surface():
+
+    ''' Just what DiskCache.store reads from a cairo.ImageSurface '''
+
+    def flush(self):
+        pass
+
+    def get_data(self):
+        return b'\0' * 4 * 8 * 8
+
+    def get_width(self):
+        return 8
+
+    def get_height(self):
+        return 8
+
+    def get_stride(self):
+        return 4 * 8
+
+
+def test_concurrent_stores_of_one_image(tmp_path, caplog):
+    source = tmp_path / 'apple.png'
+    source.write_bytes(b'png')
+    cache = DiskCache(str(tmp_path / 'cache'), 8, (1200, 900), 1)
+
+    def store():
+        for i in range(50):
+            cache.store(str(source), Surface())
+
+    # As when the start-up preload and a prefetch decode the same image
+    threads = [threading.Thread(target=store) for i in range(4)]
+    with caplog.at_level(logging.ERROR, logger='recall-activity'):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert caplog.records == []
+    assert os.listdir(str(tmp_path / 'cache')) == ['apple-8.argb']
+    cache.save_index()
+    assert DiskCache(str(tmp_path / 'cache'), 8, (1200, 900),
+                     1)._entries[str(source)]['width'] == 8
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import json
+import random
+
+import pytest
+
+import engine
+from engine import Engine, RoundGenerator, PoolTooSmall
+
+GAMES = [engine.REPEATED, engine.MISSING, engine.N_BACK,
+         engine.COLOR_REPEATED]
+LEVELS = range(3, engine.NUMBER_OF_DOTS + 1, 3)
+
+
+def smallest_pool(game, level):
+    ''' The fewest symbols each game can be played with '''
+    if game == engine.N_BACK:
+        return engine.RECALL_LENGTH
+    if game == engine.MISSING:
+        return level + 1
+    return max(level - 1, engine.NUMBER_OF_OPTS)
+
+
+def check_round(game, level, plan):
+    options = plan.options
+    assert len(options) == engine.NUMBER_OF_OPTS
+    assert len(set(options)) == engine.NUMBER_OF_OPTS
+    correct = options[plan.answer]
+    if game == engine.N_BACK:
+        assert len(plan.recall_list) == engine.RECALL_LENGTH
+        assert correct == plan.recall_list[plan.repeat]
+        assert plan.repeat == engine.RECALL_LENGTH - level // 3 - 1
+        # The options are images from the list, not positions in it
+        assert set(options) <= set(plan.recall_list)
+    elif game == engine.MISSING:
+        assert len(set(plan.dots)) == level
+        assert correct not in plan.dots
+        assert all(n in plan.dots for n in options if n != correct)
+    else:
+        assert len(plan.dots) == level
+        assert plan.dots.count(correct) == 2
+        assert plan.dots[plan.repeat] == correct
+        assert len(set(plan.dots)) == level - 1
+        if level > 3:
+            assert all(n in plan.dots for n in options)
+
+
+@pytest.mark.parametrize('game', GAMES)
+@pytest.mark.parametrize('level', LEVELS)
+def test_rounds_with_the_smallest_pool(game, level):
+    generator = RoundGenerator(random.Random(level))
+    pool_size = smallest_pool(game, level)
+    for i in range(200):
+        plan = generator.new_round(game, level, pool_size)
+        assert all(0 <= n < pool_size for n in plan.get_symbols())
+        check_round(game, level, plan)
+
+
+@pytest.mark.parametrize('game', GAMES)
+@pytest.mark.parametrize('level', LEVELS)
+def test_too_small_a_pool_raises(game, level):
+    generator = RoundGenerator(random.Random(0))
+    with pytest.raises(PoolTooSmall):
+        generator.new_round(game, level, smallest_pool(game, level) - 1)
+
+
+def test_too_small_a_pool_raises_from_deal():
+    rules = Engine(5)
+    rules.reset(engine.N_BACK)
+    rules.start_round()
+    with pytest.raises(ValueError):
+        rules.deal()
+
+
+@pytest.mark.parametrize('game', GAMES)
+def test_seeded_rounds_are_reproducible(game):
+    def play(seed):
+        rules = Engine(53, rng=random.Random(seed))
+        rules.reset(game)
+        rounds = []
+        for i in range(20):
+            rules.start_round()
+            rules.deal()
+            rules.ask()
+            rounds.append((list(rules.dots), list(rules.recall_list),
+                           list(rules.opts), rules.answer))
+        return rounds
+
+    assert play(7) == play(7)
+    assert play(7) != play(8)
+
+
+def right_choice(rules):
+    if rules.game == engine.N_BACK:
+        return rules.opts.index(rules.recall_list[rules.answer])
+    return rules.answer
+
+
+def test_rules_without_a_display():
+    intents = []
+    rules = Engine(53, listener=lambda intent, *args: intents.append(intent),
+                   rng=random.Random(3))
+    rules.reset(engine.REPEATED)
+    for i in range(engine.POINTS_TO_WIN):
+        assert not rules.is_over()
+        rules.start_round()
+        rules.deal()
+        rules.ask()
+        assert rules.choose(right_choice(rules))
+    assert rules.is_over()
+    assert rules.level == engine.NUMBER_OF_DOTS  # Advances, up to a limit
+    assert intents[:4] == [engine.CLEAR, engine.DOTS, engine.QUESTION,
+                           engine.ANSWER]
+    assert rules.game_over() == engine.POINTS_TO_WIN
+    assert rules.high_score == engine.POINTS_TO_WIN
+    assert rules.correct == 0
+    assert intents[-1] == engine.GAME_OVER
+
+
+def test_wrong_answer():
+    rules = Engine(53, rng=random.Random(4))
+    rules.reset(engine.N_BACK)
+    rules.start_round()
+    rules.deal()
+    rules.ask()
+    wrong = (right_choice(rules) + 1) % engine.NUMBER_OF_OPTS
+    assert not rules.choose(wrong)
+    assert rules.correct == 0
+
+
+@pytest.mark.parametrize('game', GAMES)
+def test_snapshot_resume_round_trip(game):
+    rules = Engine(265, rng=random.Random(5))
+    rules.reset(game)
+    rules.correct = 4
+    rules.start_round()
+    rules.deal()
+    # Saved ids are not the in-game symbols, as with the image manifest
+    saved = json.loads(json.dumps(rules.snapshot(lambda n: n + 1000)))
+    rules.ask()
+
+    intents = []
+    resumed = Engine(265, listener=lambda intent, *args: intents.append(
+        (intent, args)))
+    assert resumed.resume(saved, lambda n: n - 1000)
+    assert resumed.game == game
+    assert resumed.level == rules.level
+    assert resumed.correct == rules.correct
+    assert resumed.dots == rules.dots
+    assert resumed.recall_list == rules.recall_list
+    assert resumed.opts == rules.opts
+    assert resumed.answer == rules.answer
+    if game == engine.N_BACK:
+        assert [intent for intent, args in intents] == [
+            engine.CLEAR, engine.QUESTION]
+    else:
+        assert intents[1] == (engine.DOTS, (rules.dots[:rules.level],))
+    assert intents[-1] == (engine.QUESTION, (rules.opts,))
+    assert resumed.choose(right_choice(resumed))
+    # Once answered, a snapshot starts a new round
+    assert resumed.snapshot()['round'] is None
+
+
+def test_resume_rejects_bad_snapshots():
+    rules = Engine(53)
+    with pytest.raises(ValueError):
+        rules.resume({'version': engine.SNAPSHOT_VERSION + 1})
+    with pytest.raises(ValueError):
+        rules.resume({'version': engine.SNAPSHOT_VERSION, 'game': 9,
+                      'level': 3, 'correct': 0})
+    snapshot = {'version': engine.SNAPSHOT_VERSION, 'game': 0, 'level': 3,
+                'correct': 0, 'round': {'dots': [1, 2, 1],
+                                        'options': [1, 2, 99],
+                                        'answer': 0, 'repeat': 2,
+                                        'recall_list': None}}
+    with pytest.raises(ValueError):
+        rules.resume(snapshot)  # 99 is not in the pool
+
+
+def saved_round(game, level=6):
+    rules = Engine(53, rng=random.Random(6))
+    rules.reset(game)
+    rules.level = level
+    rules.start_round()
+    rules.deal()
+    return rules.snapshot()
+
+
+@pytest.mark.parametrize('level', [0, 2, engine.NUMBER_OF_DOTS + 1, 30])
+def test_resume_rejects_a_bad_level(level):
+    snapshot = saved_round(engine.REPEATED)
+    snapshot['level'] = level
+    with pytest.raises(ValueError):
+        Engine(53).resume(snapshot)
+    snapshot['round'] = None
+    with pytest.raises(ValueError):
+        Engine(53).resume(snapshot)
+
+
+def test_resume_rejects_a_board_of_the_wrong_size():
+    snapshot = saved_round(engine.MISSING)
+    snapshot['level'] = 9
+    with pytest.raises(ValueError):
+        Engine(53).resume(snapshot)
+
+
+def test_resume_rejects_an_n_back_answer_not_offered():
+    snapshot = saved_round(engine.N_BACK)
+    saved = snapshot['round']
+    target = saved['recall_list'][saved['repeat']]
+    saved['options'] = [n for n in saved['recall_list']
+                        if n != target][:engine.NUMBER_OF_OPTS]
+    with pytest.raises(ValueError):
+        Engine(53).resume(snapshot)
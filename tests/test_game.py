@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import gc
+import os
+import random
+import tracemalloc
+
+import pytest
+
+import engine
+import game
+from game import Game
+
+
+class Canvas():
+
+    def __getattr__(self, name):  # connect, set_can_focus, ...
+        return lambda *args, **kwargs: None
+
+
+class Label():
+
+    def set_label(self, text):
+        self.text = text
+
+
+class Parent():
+
+    def __init__(self):
+        self.status = Label()
+
+    def show_all(self):
+        pass
+
+
+class Steps():
+
+    ''' A timeline that never runs anything; the test drives the game '''
+
+    def after(self, delay, callback, *args):
+        return 0
+
+    def cancel(self):
+        pass
+
+    def is_busy(self):
+        return False
+
+
+class Dot():
+
+    ''' Stands in for a dot surface (it looks like an atlas region) '''
+
+    atlas = None
+
+    def __init__(self, size):
+        self.width = size
+        self.height = size
+
+    def get_width(self):
+        return self.width
+
+    def get_height(self):
+        return self.height
+
+
+@pytest.fixture
+def recall(tmp_path, monkeypatch):
+    os.makedirs(str(tmp_path / 'data'))
+    monkeypatch.setattr(game, 'get_activity_root', lambda: str(tmp_path))
+    monkeypatch.setattr(Game, '_new_dot_surface',
+                        lambda self, *args, **kwargs: Dot(self._dot_size))
+    monkeypatch.setattr(Game, '_prefetch_next_round', lambda self: None)
+    path = os.path.join(os.path.dirname(__file__), '..')
+    recall = Game(Canvas(), parent=Parent(), path=path)
+    recall._timeline = Steps()
+    recall._engine = engine.Engine(recall._pool_size(),
+                                   listener=recall._render,
+                                   rng=random.Random(1))
+    return recall
+
+
+def play_and_lose(recall):
+    ''' One round, answered wrongly, then Game Over '''
+    with recall._sprites.batch():
+        recall._engine.start_round()
+    recall._new_game()
+    recall._ask_the_question()
+    wrong = (recall._engine.answer + 1) % engine.NUMBER_OF_OPTS
+    with recall._sprites.batch():
+        assert not recall._engine.choose(wrong)
+    recall._game_over()
+
+
+def test_game_over_reuses_its_sprites(recall):
+    sprites = len(recall._sprites.list)
+    for i in range(20):  # Warm up
+        play_and_lose(recall)
+    assert len(recall._sprites.list) == sprites
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(300):
+        play_and_lose(recall)
+        assert len(recall._sprites.list) == sprites
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(stat.size_diff for stat in
+                 after.compare_to(before, 'filename'))
+    assert growth < 64 * 1024
+
+
+def test_resume_shows_the_saved_board(recall):
+    recall._engine.reset(engine.MISSING)
+    recall._engine.level = 6
+    recall._engine.start_round()
+    recall._engine.deal()
+    snapshot = recall.save_game()
+    recall.resume_game(snapshot)
+    level = recall._engine.level
+    assert all(opt.visible for opt in recall._opts)
+    # The board is hidden behind the question, holding the saved images
+    assert not any(dot.visible for dot in recall._dots[:level])
+    assert all(dot.labels[0] == '' for dot in recall._dots[:level])
+    with recall._sprites.batch():
+        recall._engine.choose(recall._engine.answer)
+    assert all(dot.visible and dot.labels[0] == ''
+               for dot in recall._dots[:level])
+
+
+@pytest.mark.parametrize('snapshot', [
+    {'version': engine.SNAPSHOT_VERSION, 'game': 7, 'level': 3,
+     'correct': 0},
+    {'version': engine.SNAPSHOT_VERSION, 'game': 'x'},
+    {'version': engine.SNAPSHOT_VERSION + 1, 'game': engine.N_BACK},
+    None])
+def test_resume_falls_back_to_a_playable_game(recall, snapshot):
+    recall._engine.reset(engine.MISSING)
+    recall.resume_game(snapshot)
+    assert recall._engine.game in engine.GAMES
+    assert recall._engine.pool_size == recall._pool_size()
+
+
+@pytest.mark.parametrize('game', [engine.REPEATED, engine.N_BACK])
+def test_resume_falls_back_on_a_bad_level(recall, game):
+    recall._engine.reset(game)
+    recall._engine.start_round()
+    recall._engine.deal()
+    snapshot = recall.save_game()
+    snapshot['level'] = 30
+    recall.resume_game(snapshot)  # Must not raise
+    assert recall._engine.game == game
+    assert recall._engine.level == 3
+
+
+def test_game_over_shows_the_scores(recall):
+    play_and_lose(recall)
+    assert all(shape.visible for shape in recall._gameover)
+    assert recall._score[-1].labels[0].strip() == '0'
+    with recall._sprites.batch():
+        recall._engine.start_round()
+    assert not any(shape.visible for shape in
+                   recall._gameover + recall._score + recall._highscore)
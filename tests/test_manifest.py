@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import struct
+
+from manifest import load_manifest, update_manifest, PNG_SIGNATURE
+
+
+def write_png(path, width=4, height=3):
+    ''' Just the signature and IHDR chunk, which is all png_size reads '''
+    with open(str(path), 'wb') as fp:
+        fp.write(PNG_SIGNATURE + struct.pack('>I', 13) + b'IHDR' +
+                 struct.pack('>II', width, height))
+
+
+def ids(image_path):
+    return dict((entry['file'], entry['id'])
+                for entry in load_manifest(str(image_path)))
+
+
+def test_entries(tmp_path):
+    write_png(tmp_path / 'a.png', 210, 180)
+    (tmp_path / 'notes.txt').write_text(u'not an image')
+    entries = update_manifest(str(tmp_path))
+    assert len(entries) == 1
+    assert entries[0]['file'] == 'a.png'
+    assert (entries[0]['width'], entries[0]['height']) == (210, 180)
+    assert len(entries[0]['sha1']) == 40
+    assert load_manifest(str(tmp_path)) == entries
+
+
+def test_ids_survive_rebuilds(tmp_path):
+    for name in ['b.png', 'c.png']:
+        write_png(tmp_path / name)
+    update_manifest(str(tmp_path))
+    write_png(tmp_path / 'a.png')  # Sorts first, but is newest
+    update_manifest(str(tmp_path))
+    assert ids(tmp_path) == {'a.png': 2, 'b.png': 0, 'c.png': 1}
+
+
+def test_removed_ids_are_not_reused(tmp_path):
+    for name in ['a.png', 'b.png', 'c.png']:
+        write_png(tmp_path / name)
+    update_manifest(str(tmp_path))
+    (tmp_path / 'c.png').unlink()
+    update_manifest(str(tmp_path))
+    assert ids(tmp_path) == {'a.png': 0, 'b.png': 1}
+    write_png(tmp_path / 'new.png')
+    update_manifest(str(tmp_path))
+    assert ids(tmp_path) == {'a.png': 0, 'b.png': 1, 'new.png': 3}
+
+
+def test_missing_or_corrupt_manifest(tmp_path):
+    assert load_manifest(str(tmp_path)) is None
+    (tmp_path / 'manifest.json').write_text(u'{"images": [')
+    assert load_manifest(str(tmp_path)) is None
+    write_png(tmp_path / 'a.png')
+    update_manifest(str(tmp_path))
+    assert ids(tmp_path) == {'a.png': 0}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import json
+
+import pytest
+
+import scores
+from scores import ScoreStore
+
+
+def test_scores_are_kept_per_game_and_level(tmp_path):
+    store = ScoreStore(str(tmp_path))
+    assert store.record(0, 3, 5) == 5
+    assert store.record(0, 6, 3) == 5
+    assert store.record(2, 3, 8) == 8
+    assert store.get_high_score(0) == 5
+    assert store.get_high_score(1) == 0
+    assert store.get_level_best(0, 6) == 3
+    history = store.get_history(0)
+    assert [entry[1:] for entry in history] == [(0, 3, 5), (0, 6, 3)]
+    assert store.flush(timeout=5)
+
+    store = ScoreStore(str(tmp_path))
+    assert store.get_high_score(0) == 5
+    assert store.get_high_score(2) == 8
+    assert len(store.get_history()) == 3
+
+
+def test_history_is_bounded(tmp_path):
+    store = ScoreStore(str(tmp_path))
+    for score in range(scores.HISTORY_LENGTH + 10):
+        store.record(0, 3, score)
+    history = store.get_history()
+    assert len(history) == scores.HISTORY_LENGTH
+    assert history[-1][3] == scores.HISTORY_LENGTH + 9
+
+
+def test_legacy_high_score_is_migrated(tmp_path):
+    (tmp_path / scores.LEGACY).write_text(u'12\n')
+    store = ScoreStore(str(tmp_path), games=4)
+    assert [store.get_high_score(game) for game in range(4)] == [12] * 4
+
+
+@pytest.mark.parametrize('contents', [
+    u'{"version": 1, "best": {',
+    u'[]',
+    u'{"version": 99, "best": {}, "levels": {}, "history": []}',
+    u'{"version": 1, "best": [], "levels": {}, "history": []}'])
+def test_an_unreadable_file_is_moved_aside(tmp_path, contents):
+    (tmp_path / scores.SCORES).write_text(contents)
+    store = ScoreStore(str(tmp_path))
+    assert store.get_high_score(0) == 0
+    assert (tmp_path / (scores.SCORES + '.corrupt')).read_text() == contents
+    assert store.record(0, 3, 4) == 4
+
+
+def test_bad_entries_are_dropped(tmp_path):
+    (tmp_path / scores.SCORES).write_text(json.dumps({
+        'version': 1,
+        'best': {'0': 'x', '1': 7, '2': True},
+        'levels': {'0': {'3': None, '6': 2}, '1': []},
+        'history': [[1, 0, 3, 'x'], 'x', [1, 1, 3, 7]]}))
+    store = ScoreStore(str(tmp_path))
+    assert store.get_high_score(0) == 0
+    assert store.get_high_score(1) == 7
+    assert store.get_level_best(0, 6) == 2
+    assert store.get_history() == [(1, 1, 3, 7)]
+    # These used to raise TypeError, aborting Game Over
+    assert store.record(0, 3, 4) == 4
+    assert store.record(1, 3, 4) == 7
+    assert store.record(2, 3, 4) == 4
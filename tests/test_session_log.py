@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import logging
+import os
+import threading
+import time
+
+import session_log
+from session_log import SessionLog, read_events
+
+
+def test_events_are_read_back_in_order(tmp_path):
+    log = SessionLog(str(tmp_path), 'session-1')
+    for i in range(10):
+        log.record('answer', choice=i)
+    log.flush()
+    events = list(read_events(str(tmp_path)))
+    assert [event['choice'] for event in events] == list(range(10))
+    assert all(event['event'] == 'answer' and
+               event['session'] == 'session-1' for event in events)
+
+
+def test_events_are_written_in_batches(tmp_path):
+    log = SessionLog(str(tmp_path), 'session-1', capacity=16, batch=4)
+    for i in range(3):
+        log.record('question')
+    assert os.listdir(str(tmp_path)) == []
+    log.record('question')  # A full batch goes to the writer thread
+    log._last.result()
+    assert len(list(read_events(str(tmp_path)))) == 4
+
+
+def test_a_slow_disk_drops_the_oldest_events(tmp_path, caplog):
+    log = SessionLog(str(tmp_path), 'session-1', capacity=8, batch=4)
+    release = threading.Event()
+    append = log._append
+
+    def slow_append(batch):
+        release.wait(5)
+        append(batch)
+
+    log._append = slow_append
+    for i in range(4):
+        log.record('answer', choice=i)  # Handed to the (stuck) writer
+    for i in range(4, 24):
+        log.record('answer', choice=i)  # Only the newest 8 are kept
+    release.set()
+    with caplog.at_level(logging.ERROR, logger='recall-activity'):
+        log.flush()
+    choices = [event['choice'] for event in read_events(str(tmp_path))]
+    assert choices == [0, 1, 2, 3] + list(range(16, 24))
+    assert 'dropped 12 events' in caplog.text
+
+
+def test_truncated_lines_and_old_events_are_skipped(tmp_path):
+    log = SessionLog(str(tmp_path), 'session-1')
+    last_year = time.time() - 366 * 24 * 3600
+    now = time.time()
+    # Two months, so two files
+    log._append([{'t': last_year, 'event': 'old'},
+                 {'t': now, 'event': 'new'}])
+    names = sorted(os.listdir(str(tmp_path)))
+    assert len(names) == 2
+    with open(os.path.join(str(tmp_path), names[-1]), 'a') as fp:
+        fp.write('{"t": %f, "event": "cut sh' % (now))  # A crash
+    assert [event['event'] for event in read_events(str(tmp_path))] == [
+        'old', 'new']
+    assert [event['event'] for event in
+            read_events(str(tmp_path), since=now - 60)] == ['new']
+    assert list(read_events(str(tmp_path / 'missing'))) == []
+    assert all(name.startswith(session_log.PREFIX) for name in names)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import pytest
+
+import sprites
+from sprites import Sprites, Sprite
+from conftest import Rectangle
+
+
+class Widget():
+
+    def __init__(self):
+        self.damage = []
+
+    def queue_draw_area(self, x, y, width, height):
+        self.damage.append((x, y, width, height))
+
+
+class Image():
+
+    ''' Looks like an atlas region to Sprite.set_image '''
+
+    atlas = None
+
+    def __init__(self, size):
+        self._size = size
+        self.width = size
+        self.height = size
+
+    def set_source(self, cr, x, y):
+        pass
+
+    def get_width(self):
+        return self._size
+
+    def get_height(self):
+        return self._size
+
+
+class Context():
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'grid'])
+def board(request, monkeypatch):
+    ''' Sprites with a row of three 40x40 sprites, with either index '''
+    if request.param and not sprites.HAVE_NUMPY:
+        pytest.skip('NumPy is not installed')
+    monkeypatch.setattr(sprites, 'HAVE_NUMPY', request.param)
+    collection = Sprites(Widget())
+    row = [Sprite(collection, x * 50, 0, Image(40)) for x in range(3)]
+    return collection, row
+
+
+def test_find_sprite(board):
+    collection, row = board
+    assert collection.find_sprite((65, 20), region=True) is row[1]
+    assert collection.find_sprite((45, 20), region=True) is None
+
+
+def test_batch_set_layer_keeps_sprites_findable(board):
+    collection, row = board
+    with collection.batch():
+        for spr in row:
+            spr.set_layer(200)
+    for i, spr in enumerate(row):
+        assert collection.find_sprite((i * 50 + 20, 20), region=True) is spr
+    assert len(collection.list) == len(row)
+
+
+def test_batch_set_layer_changes_stacking(board):
+    collection, row = board
+    row[0].move((50, 0))  # On top of row[1], but created first
+    assert collection.find_sprite((70, 20), region=True) is row[1]
+    with collection.batch():
+        row[0].set_layer(300)
+    assert collection.find_sprite((70, 20), region=True) is row[0]
+    assert collection.list[-1] is row[0]
+
+
+def test_batch_set_layer_then_hide_keeps_the_list_in_order(board):
+    collection, row = board
+    collection.set_retained(True, below=100)
+    for spr in row:
+        spr.set_layer(100)
+    with collection.batch():
+        row[2].set_layer(50)
+        row[2].hide()
+    row[2].restore()
+    layers = [spr.layer for spr in collection.list]
+    assert layers == sorted(layers)
+    assert collection.list[0] is row[2]
+    assert collection.is_retained(row[2])
+
+
+def test_batch_coalesces_damage(board):
+    collection, row = board
+    widget = collection.widget
+    widget.damage = []
+    with collection.batch():
+        for spr in row:
+            spr.set_layer(200)
+            spr.set_label('?')
+    assert 0 < len(widget.damage) <= sprites.MAX_DAMAGE_RECTS
+
+
+def test_hidden_sprites_are_not_found_or_drawn(board):
+    collection, row = board
+    row[1].hide()
+    assert collection.find_sprite((70, 20), region=True) is None
+    drawn = collection.redraw_sprites(area=Rectangle(0, 0, 200, 40),
+                                      cr=Context())
+    assert drawn == 2
+    row[1].restore()
+    assert collection.find_sprite((70, 20), region=True) is row[1]
+
+
+def test_redraw_area(board):
+    collection, row = board
+    assert collection.redraw_sprites(area=[Rectangle(55, 5, 10, 10)],
+                                     cr=Context()) == 1
+    assert collection.redraw_sprites(area=[Rectangle(0.5, 5, 150.5, 10)],
+                                     cr=Context()) == 3
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+import pytest
+
+import timeline
+from timeline import Timeline
+
+FRAME = 16667  # us, 60 Hz
+
+
+class MainLoop():
+
+    ''' A fake GLib main loop and frame clock with a manual clock '''
+
+    def __init__(self):
+        self.time = 1000000
+        self.timeouts = {}
+        self.ticks = {}
+        self.wakeups = 0
+        self._next_id = 0
+
+    # GLib
+    def get_monotonic_time(self):
+        return self.time
+
+    def timeout_add(self, delay, callback):
+        self._next_id += 1
+        self.timeouts[self._next_id] = (self.time + delay * 1000, callback)
+        return self._next_id
+
+    def source_remove(self, source_id):
+        del self.timeouts[source_id]
+
+    # Widget
+    def add_tick_callback(self, callback):
+        self._next_id += 1
+        self.ticks[self._next_id] = callback
+        return self._next_id
+
+    def remove_tick_callback(self, tick_id):
+        del self.ticks[tick_id]
+
+    def get_frame_clock(self):
+        return self
+
+    # Gdk.FrameClock
+    def get_frame_time(self):
+        return self.time
+
+    def get_refresh_info(self, now):
+        return FRAME, now
+
+    def run(self, ms):
+        ''' Advance the clock frame by frame, dispatching as GLib would '''
+        end = self.time + ms * 1000
+        while self.time < end:
+            self.time += FRAME
+            for source_id, (due, callback) in list(self.timeouts.items()):
+                if due <= self.time and source_id in self.timeouts:
+                    del self.timeouts[source_id]
+                    self.wakeups += 1
+                    callback()
+            for tick_id, callback in list(self.ticks.items()):
+                if tick_id not in self.ticks:
+                    continue
+                self.wakeups += 1
+                try:
+                    keep = callback(self, self)
+                except RuntimeError:
+                    keep = False  # PyGObject logs it and drops the tick
+                if not keep:
+                    self.ticks.pop(tick_id, None)
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    loop = MainLoop()
+    monkeypatch.setattr(timeline, 'GLib', loop)
+    return loop
+
+
+def test_steps_run_in_order(loop):
+    ran = []
+    steps = Timeline(loop)
+    steps.after(300, ran.append, 'b')
+    steps.after(100, ran.append, 'a')
+    loop.run(200)
+    assert ran == ['a']
+    loop.run(200)
+    assert ran == ['a', 'b']
+    assert not steps.is_busy()
+
+
+def test_pending_step_does_not_tick_every_frame(loop):
+    ran = []
+    steps = Timeline(loop)
+    steps.after(5000, ran.append, 'done')
+    loop.run(6000)
+    assert ran == ['done']
+    # One timeout and one frame, rather than ~300 frames
+    assert loop.wakeups <= 3
+    assert loop.ticks == {} and loop.timeouts == {}
+
+
+def test_chained_steps_do_not_drift(loop):
+    times = []
+    steps = Timeline(loop)
+
+    def step():
+        times.append(loop.time)
+        if len(times) < 10:
+            steps.after(500, step)
+
+    steps.after(500, step)
+    loop.run(6000)
+    assert len(times) == 10
+    assert times[-1] - times[0] <= 9 * 500000 + FRAME
+
+
+def test_failing_step_does_not_stall_the_timeline(loop):
+    ran = []
+    steps = Timeline(loop)
+
+    def fail():
+        raise RuntimeError('boom')
+
+    steps.after(100, fail)
+    loop.run(200)
+    steps.after(100, ran.append, 'after')
+    loop.run(200)
+    assert ran == ['after']
+
+
+def test_cancel(loop):
+    ran = []
+    steps = Timeline(loop)
+    steps.after(100, ran.append, 'a')
+    step_id = steps.after(200, ran.append, 'b')
+    steps.cancel_step(step_id)
+    loop.run(300)
+    assert ran == ['a']
+    steps.after(100, ran.append, 'c')
+    steps.cancel()
+    loop.run(300)
+    assert ran == ['a']
+    assert loop.ticks == {} and loop.timeouts == {}
+
+
+def test_step_may_cancel_and_reschedule(loop):
+    ran = []
+    steps = Timeline(loop)
+
+    def restart():
+        steps.cancel()
+        steps.after(100, ran.append, 'restarted')
+
+    steps.after(100, restart)
+    steps.after(110, ran.append, 'cancelled')
+    loop.run(500)
+    assert ran == ['restarted']
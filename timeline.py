@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+A timeline of keyframed steps, driven by the widget's Gdk.FrameClock.
+
+Steps run on the first frame at or after their due time, so changes are
+aligned with the display refresh. Between steps the timeline sleeps in a
+single GLib timeout; the tick callback is only installed for the frame
+that runs a step, so a pending step costs one wakeup, not one per frame.
+
+Example usage:
+        timeline = Timeline(widget)
+        timeline.after(500, step_one)  # step_one may schedule more steps
+        ...
+        timeline.cancel()  # drop the whole sequence
+'''
+
+from bisect import insort
+from gi.repository import GLib
+
+import logging
+_logger = logging.getLogger('recall-activity')
+
+
+class Timeline():
+
+    ''' Run callbacks at frame-aligned times '''
+
+    def __init__(self, widget):
+        self._widget = widget
+        self._steps = []  # sorted (due time in us, sequence, callback, args)
+        self._sequence = 0
+        self._tick_id = None
+        self._timeout_id = None
+        self._now = None
+        self.late_frames = 0
+
+    def after(self, delay, callback, *args):
+        ''' Run callback(*args) delay milliseconds from now '''
+        self._sequence += 1
+        due = self._current_time() + delay * 1000
+        insort(self._steps, (due, self._sequence, callback, args))
+        if self._tick_id is None:  # Otherwise _tick reschedules
+            self._sleep()
+        return self._sequence
+
+    def cancel(self):
+        ''' Cancel every pending step '''
+        self._steps = []
+        self._stop()
+
+    def cancel_step(self, step_id):
+        ''' Cancel a single pending step '''
+        self._steps = [step for step in self._steps if step[1] != step_id]
+        if len(self._steps) == 0:
+            self._stop()
+        elif self._tick_id is None:
+            self._sleep()
+
+    def is_busy(self):
+        ''' Are any steps pending? '''
+        return len(self._steps) > 0
+
+    def _current_time(self):
+        # While a step runs, new steps are timed from its frame, so a
+        # chain of steps does not drift.
+        if self._now is not None:
+            return self._now
+        frame_clock = self._widget.get_frame_clock()
+        if frame_clock is None:  # Not realized yet
+            return GLib.get_monotonic_time()
+        return frame_clock.get_frame_time()
+
+    def _stop(self):
+        if self._tick_id is not None:
+            self._widget.remove_tick_callback(self._tick_id)
+            self._tick_id = None
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+
+    def _sleep(self):
+        ''' Wake up when the next step is due '''
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+        if len(self._steps) == 0:
+            return
+        # Frame times are on the monotonic clock
+        delay = self._steps[0][0] - GLib.get_monotonic_time()
+        self._timeout_id = GLib.timeout_add(max(0, (delay + 999) // 1000),
+                                            self._wake)
+
+    def _wake(self):
+        ''' Run the due steps on the next frame '''
+        self._timeout_id = None
+        if self._tick_id is None and len(self._steps) > 0:
+            self._tick_id = self._widget.add_tick_callback(self._tick)
+        return False
+
+    def _tick(self, widget, frame_clock):
+        now = frame_clock.get_frame_time()
+        interval = frame_clock.get_refresh_info(now)[0]
+        keep_ticking = False
+        try:
+            while len(self._steps) > 0 and self._steps[0][0] <= now:
+                due, sequence, callback, args = self._steps.pop(0)
+                if interval > 0 and now - due > interval * 1.5:
+                    self.late_frames += 1
+                    _logger.debug('timeline: %s ran %d ms late' %
+                                  (callback.__name__, (now - due) / 1000))
+                self._now = due
+                try:
+                    callback(*args)
+                finally:
+                    self._now = None
+            # Only keep the frame clock running for a step due next frame
+            # (and not if a step cancelled the timeline, removing us)
+            keep_ticking = self._tick_id is not None and \
+                len(self._steps) > 0 and \
+                self._steps[0][0] <= now + interval
+        finally:
+            # Even if a step raised, the timeline must carry on
+            if not keep_ticking:
+                self._tick_id = None
+                self._sleep()
+        return keep_ticking
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2026 Sugar Labs
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+Micro-benchmark: native Cairo dots vs. the SVG/librsvg round trip.
+
+Run from the top of the source tree:
+        python3 tools/benchmark_dots.py
+'''
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from gi.repository import GdkPixbuf
+
+from surface_cache import dot_surface, pixbuf_to_surface
+
+
+def svg_dot(color, size):
+    svg = '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" ' \
+        'width="%d" height="%d">\n' % (size, size)
+    svg += '<circle style="fill:%s;stroke:%s;" r="%f" cx="%f" ' \
+        'cy="%f" />\n</svg>\n' % (color, color, size / 2. - 0.5,
+                                  size / 2., size / 2.)
+    pl = GdkPixbuf.PixbufLoader.new_with_type('svg')
+    pl.write(svg.encode())
+    pl.close()
+    return pixbuf_to_surface(pl.get_pixbuf(), size, size)
+
+
+if __name__ == '__main__':
+    for size in [40, 150, 300]:
+        n = 200
+        svg = timeit.timeit(lambda: svg_dot('#FF8080', size), number=n)
+        native = timeit.timeit(lambda: dot_surface('#FF8080', size),
+                               number=n)
+        print('%4dpx: svg %.3f ms, cairo %.3f ms (%.1fx)' %
+              (size, 1000 * svg / n, 1000 * native / n, svg / native))